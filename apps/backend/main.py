@@ -1,7 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
 import logging
+import sys
+from PIL import features as pil_features
 from src.api.routes import api_router
 from src.db.config import settings
 
@@ -53,12 +56,20 @@ app = FastAPI(
     description=settings.api_description,
     version=settings.api_version,
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse
 )
 
 logger = logging.getLogger(__name__)
 logger.info("Starting ImageGenAI FastAPI application")
 
+# JPEG decode/encode speed depends on the libjpeg Pillow links against; the
+# official wheels bundle libjpeg-turbo, so make a slower build visible
+if pil_features.check_feature("libjpeg_turbo"):
+    logger.info("Pillow JPEG codec: libjpeg-turbo %s", pil_features.version_feature("libjpeg_turbo"))
+else:
+    logger.warning("Pillow is not built with libjpeg-turbo; JPEG thumbnails and uploads will decode slower")
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -78,6 +89,9 @@ async def health_check():
 
 # No longer mounting static files since we use in-memory image processing
 
+# uvloop (installed with uvicorn[standard]) has no Windows build; fall back to asyncio there
+LOOP_IMPL = "asyncio" if sys.platform == "win32" else "uvloop"
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -85,5 +99,7 @@ if __name__ == "__main__":
         port=settings.port,
         reload=settings.debug,
         reload_dirs=["src"],
+        loop=LOOP_IMPL,
+        http="httptools",
         log_level="info"
     )
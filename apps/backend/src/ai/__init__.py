@@ -2,20 +2,17 @@
 AI Generators Module
 
 This module contains AI-powered generators for various tasks:
-- PromptToImageGenerator: Converts text prompts + reference images to generated images
-- ImageToPromptGenerator: Converts images to descriptive text prompts
 - PromptGenerator: Generates prompts for various image generation tasks
+
+Image generation lives in providers/ (GeminiImageGenerator, ReplicateImageGenerator,
+StabilityImageGenerator), created through ImageGeneratorFactory. Image-to-prompt
+generation lives in providers/gemini (GeminiPromptGenerator), created through
+PromptGeneratorFactory.
 """
 
-from .prompt_to_image_generator import PromptToImageGenerator, prompt_to_image_generator
-from .image_to_prompt_generator import ImageToPromptGenerator, image_to_prompt_generator
 from .prompt_generator import PromptGenerator, prompt_generator
 
 __all__ = [
-    'PromptToImageGenerator',
-    'prompt_to_image_generator',
-    'ImageToPromptGenerator', 
-    'image_to_prompt_generator',
     'PromptGenerator',
     'prompt_generator'
 ]
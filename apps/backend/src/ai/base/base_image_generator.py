@@ -3,8 +3,7 @@ Abstract base class for image generators
 """
 
 from abc import ABC, abstractmethod
-from typing import Tuple, Optional
-from fastapi import UploadFile, HTTPException
+from typing import List, Tuple, Optional
 
 
 class BaseImageGenerator(ABC):
@@ -13,15 +12,17 @@ class BaseImageGenerator(ABC):
     @abstractmethod
     async def generate_from_image_and_text(
         self, 
-        image_file: UploadFile, 
-        prompt: str
+        image_content: bytes, 
+        prompt: str,
+        content_type: Optional[str] = None
     ) -> Tuple[bytes, str]:
         """
         Generate an image using a reference image and text prompt
         
         Args:
-            image_file: Uploaded image file (mandatory)
+            image_content: Raw bytes of the uploaded reference image (mandatory)
             prompt: Text prompt for image generation
+            content_type: MIME type of the reference image, if known
             
         Returns:
             Tuple[bytes, str]: (image_data, content_type)
@@ -50,14 +51,14 @@ class BaseImageGenerator(ABC):
     @abstractmethod
     async def generate_from_multiple_images_and_text(
         self, 
-        image_files: list, 
+        images: List[Tuple[bytes, Optional[str]]], 
         prompt: str
     ) -> Tuple[bytes, str]:
         """
         Generate an image using multiple reference images and text prompt
         
         Args:
-            image_files: List of uploaded image files (mandatory)
+            images: List of (image_content, content_type) for each uploaded image (mandatory)
             prompt: Text prompt for image generation
             
         Returns:
@@ -67,48 +68,3 @@ class BaseImageGenerator(ABC):
             HTTPException: If generation fails
         """
         pass
-    
-    def process_reference_image(self, image_file: UploadFile) -> str:
-        """
-        Process uploaded reference image and return as data URL
-        This is a common utility method that can be overridden if needed
-        
-        Args:
-            image_file: Uploaded image file
-            
-        Returns:
-            str: Data URL of the reference image
-        """
-        from pathlib import Path
-        import base64
-        
-        try:
-            # Read image content
-            image_content = image_file.file.read()
-            image_file.file.seek(0)  # Reset file pointer
-            
-            # Determine content type from file extension
-            original_filename = image_file.filename or "reference"
-            file_extension = Path(original_filename).suffix.lower()
-            
-            content_type_map = {
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.png': 'image/png',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp'
-            }
-            content_type = content_type_map.get(file_extension, 'image/jpeg')
-            
-            # Convert to base64 data URL
-            image_base64 = base64.b64encode(image_content).decode('utf-8')
-            data_url = f"data:{content_type};base64,{image_base64}"
-            
-            return data_url
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to process reference image: {str(e)}"
-            )
-
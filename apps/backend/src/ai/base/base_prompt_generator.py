@@ -3,6 +3,7 @@ Abstract base class for prompt generators (image-to-prompt)
 """
 
 from abc import ABC, abstractmethod
+from typing import Optional
 from PIL import Image
 
 
@@ -10,12 +11,19 @@ class BasePromptGenerator(ABC):
     """Abstract base class for image-to-prompt generation providers"""
     
     @abstractmethod
-    async def generate_prompt_from_image(self, image: Image.Image) -> str:
+    async def generate_prompt_from_image(
+        self,
+        image: Optional[Image.Image] = None,
+        image_bytes: Optional[bytes] = None,
+        mime_type: Optional[str] = None
+    ) -> str:
         """
         Generate a descriptive prompt from an image
         
         Args:
-            image: PIL Image object
+            image: PIL Image object (used when raw bytes are not provided)
+            image_bytes: Original encoded image bytes, sent as-is to skip a re-encode
+            mime_type: MIME type of image_bytes (required when image_bytes is given)
             
         Returns:
             str: Generated prompt text
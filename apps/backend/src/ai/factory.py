@@ -3,7 +3,7 @@ Factory for creating AI provider instances
 """
 
 import logging
-from typing import Optional
+from typing import Dict, Optional
 
 from .base.base_image_generator import BaseImageGenerator
 from .base.base_prompt_generator import BasePromptGenerator
@@ -24,6 +24,7 @@ class ImageGeneratorFactory:
         "replicate": ReplicateImageGenerator,
         "stability": StabilityImageGenerator,
     }
+    _instances: Dict[str, BaseImageGenerator] = {}
     
     @classmethod
     def create(cls, provider: str, api_key: Optional[str] = None) -> BaseImageGenerator:
@@ -57,6 +58,30 @@ class ImageGeneratorFactory:
             logger.error(f"Failed to create {provider_lower} generator: {str(e)}", exc_info=True)
             raise
     
+    @classmethod
+    def get_or_create(cls, provider: str) -> BaseImageGenerator:
+        """
+        Get a shared image generator for the provider, creating it on first use
+        
+        Instances built from environment credentials are reused across requests
+        so the client and its configuration are only set up once per process.
+        
+        Args:
+            provider: Provider name ("gemini", "replicate", "stability")
+            
+        Returns:
+            BaseImageGenerator: Shared instance of the requested provider
+            
+        Raises:
+            ValueError: If provider is not supported
+        """
+        provider_lower = provider.lower().strip()
+        generator = cls._instances.get(provider_lower)
+        if generator is None:
+            generator = cls.create(provider_lower)
+            cls._instances[provider_lower] = generator
+        return generator
+    
     @classmethod
     def get_available_providers(cls) -> list:
         """Get list of available provider names"""
@@ -69,6 +94,7 @@ class PromptGeneratorFactory:
     _providers = {
         "gemini": GeminiPromptGenerator,
     }
+    _instances: Dict[str, BasePromptGenerator] = {}
     
     @classmethod
     def create(cls, provider: str, api_key: Optional[str] = None) -> BasePromptGenerator:
@@ -102,6 +128,27 @@ class PromptGeneratorFactory:
             logger.error(f"Failed to create {provider_lower} prompt generator: {str(e)}", exc_info=True)
             raise
     
+    @classmethod
+    def get_or_create(cls, provider: str) -> BasePromptGenerator:
+        """
+        Get a shared prompt generator for the provider, creating it on first use
+        
+        Args:
+            provider: Provider name (currently only "gemini" is supported)
+            
+        Returns:
+            BasePromptGenerator: Shared instance of the requested provider
+            
+        Raises:
+            ValueError: If provider is not supported
+        """
+        provider_lower = provider.lower().strip()
+        generator = cls._instances.get(provider_lower)
+        if generator is None:
+            generator = cls.create(provider_lower)
+            cls._instances[provider_lower] = generator
+        return generator
+    
     @classmethod
     def get_available_providers(cls) -> list:
         """Get list of available provider names"""
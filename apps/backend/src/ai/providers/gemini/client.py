@@ -0,0 +1,30 @@
+"""
+Shared Gemini client
+"""
+
+from functools import lru_cache
+
+from google import genai
+from google.genai import types
+
+from ....constants import GEMINI_HTTP_TIMEOUT_MS
+
+
+@lru_cache(maxsize=None)
+def get_gemini_client(api_key: str) -> genai.Client:
+    """
+    Get the process-wide Gemini client for an API key
+    
+    The client owns the HTTP connection pools, so generators share one instance
+    per key instead of each paying for its own TLS setup.
+    
+    Args:
+        api_key: Google AI API key
+        
+    Returns:
+        genai.Client: Cached client instance
+    """
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(timeout=GEMINI_HTTP_TIMEOUT_MS),
+    )
@@ -1,20 +1,22 @@
 """
-Gemini Image Generator - Refactored from original PromptToImageGenerator
+Gemini Image Generator
 """
 
 import os
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from io import BytesIO
 import logging
 
-from google import genai
 from PIL import Image
-from fastapi import HTTPException, UploadFile
+from fastapi import HTTPException
+from google.genai import types
 from dotenv import load_dotenv
 
+from .client import get_gemini_client
 from ...base.base_image_generator import BaseImageGenerator
 from ....db.config import settings
-from ....constants import DEFAULT_GEMINI_MODEL
+from ....utils.upload import IMAGE_SNIFF_LENGTH, sniff_image_mime
+from ....constants import DEFAULT_GEMINI_MODEL, INLINE_IMAGE_MIME_TYPES, MAX_INLINE_IMAGE_SIZE
 
 # Load environment variables
 load_dotenv()
@@ -63,17 +65,42 @@ class GeminiImageGenerator(BaseImageGenerator):
         if not self.api_key:
             raise ValueError("API key is required. Set GOOGLE_AI_API_KEY environment variable")
         
-        # Initialize the Gemini client
-        self.client = genai.Client(api_key=self.api_key)
+        # Shared Gemini client (reuses connection pools across generators)
+        self.client = get_gemini_client(self.api_key)
         self.model = getattr(settings, 'gemini_model', DEFAULT_GEMINI_MODEL)
     
-    async def generate_from_image_and_text(self, image_file: UploadFile, prompt: str) -> Tuple[bytes, str]:
+    @staticmethod
+    def _reference_part(image_content: bytes, content_type: Optional[str]):
+        """
+        Build the Gemini content part for a reference image
+        
+        Formats Gemini accepts inline are sent as the uploaded bytes, skipping a
+        decode here and a re-encode in the SDK. The MIME type comes from the
+        file's magic bytes, not the declared content type; anything that isn't
+        recognised goes through PIL, so non-images fail here with a clear error.
+        """
+        mime_type = sniff_image_mime(image_content[:IMAGE_SNIFF_LENGTH])
+        if mime_type is not None and mime_type != (content_type or '').lower().replace('image/jpg', 'image/jpeg'):
+            logger.debug(f"Declared content type {content_type} does not match sniffed {mime_type}")
+        if mime_type in INLINE_IMAGE_MIME_TYPES and len(image_content) <= MAX_INLINE_IMAGE_SIZE:
+            return types.Part.from_bytes(data=image_content, mime_type=mime_type)
+        try:
+            image = Image.open(BytesIO(image_content))
+            image.load()
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid reference image: {str(e)}")
+        return image
+    
+    async def generate_from_image_and_text(
+        self, image_content: bytes, prompt: str, content_type: Optional[str] = None
+    ) -> Tuple[bytes, str]:
         """
         Generate an image using a reference image and text prompt (async, non-blocking).
         
         Args:
-            image_file: Uploaded image file (mandatory)
+            image_content: Raw bytes of the uploaded reference image (mandatory)
             prompt: Text prompt for image generation
+            content_type: MIME type of the reference image, if known
             
         Returns:
             Tuple[bytes, str]: (image_data, content_type)
@@ -81,20 +108,17 @@ class GeminiImageGenerator(BaseImageGenerator):
         Raises:
             HTTPException: If generation fails
         """
-        # Read and process the uploaded image
-        image_content = image_file.file.read()
-        image_file.file.seek(0)  # Reset file pointer
-        reference_image = Image.open(BytesIO(image_content))
+        reference_image = self._reference_part(image_content, content_type)
         
         logger.info(f"Generating image with model: {self.model}, prompt: {prompt[:100]}...")
-        logger.info(f"Reference image size: {reference_image.size}, mode: {reference_image.mode}")
+        logger.info(f"Reference image: {len(image_content)} bytes, content type: {content_type}")
         
-        # Generate the image using Gemini async client (non-blocking)
-        async with self.client.aio as aclient:
-            response = await aclient.models.generate_content(
-                model=self.model,
-                contents=[prompt, reference_image],
-            )
+        # Generate the image using Gemini async client (non-blocking). The client
+        # is shared across requests, so it is not closed after the call.
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=[prompt, reference_image],
+        )
         
         # Log response structure for debugging
         logger.info(f"Response received. Has candidates: {hasattr(response, 'candidates') and response.candidates is not None}")
@@ -184,11 +208,10 @@ class GeminiImageGenerator(BaseImageGenerator):
             HTTPException: If generation fails
         """
         try:
-            async with self.client.aio as aclient:
-                response = await aclient.models.generate_content(
-                    model=self.model,
-                    contents=[prompt],
-                )
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=[prompt],
+            )
             
             # Process the response and return image data
             if response.candidates and len(response.candidates) > 0:
@@ -257,12 +280,14 @@ class GeminiImageGenerator(BaseImageGenerator):
                 detail=error_message
             )
     
-    async def generate_from_multiple_images_and_text(self, image_files: list, prompt: str) -> Tuple[bytes, str]:
+    async def generate_from_multiple_images_and_text(
+        self, images: List[Tuple[bytes, Optional[str]]], prompt: str
+    ) -> Tuple[bytes, str]:
         """
         Generate an image using multiple reference images and text prompt (async, non-blocking).
         
         Args:
-            image_files: List of uploaded image files (mandatory)
+            images: List of (image_content, content_type) for each uploaded image (mandatory)
             prompt: Text prompt for image generation
             
         Returns:
@@ -272,22 +297,17 @@ class GeminiImageGenerator(BaseImageGenerator):
             HTTPException: If generation fails
         """
         try:
-            # Read and process all uploaded images
-            reference_images = []
-            for image_file in image_files:
-                image_content = image_file.file.read()
-                image_file.file.seek(0)  # Reset file pointer
-                reference_image = Image.open(BytesIO(image_content))
-                reference_images.append(reference_image)
+            reference_images = [
+                self._reference_part(image_content, content_type) for image_content, content_type in images
+            ]
             
             contents = reference_images + [prompt]
             logger.info(f"Generating image with {len(reference_images)} reference images and prompt: {prompt[:100]}...")
             
-            async with self.client.aio as aclient:
-                response = await aclient.models.generate_content(
-                    model=self.model,
-                    contents=contents,
-                )
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=contents,
+            )
 
             # Log response structure for debugging
             logger.info(f"Response received. Has candidates: {hasattr(response, 'candidates') and response.candidates is not None}")
@@ -6,8 +6,9 @@ from typing import Optional
 import os
 import logging
 from PIL import Image
-from google import genai
+from google.genai import types
 
+from .client import get_gemini_client
 from ...base.base_prompt_generator import BasePromptGenerator
 from ....db.config import settings
 from ....constants import DEFAULT_GEMINI_MODEL
@@ -34,23 +35,39 @@ class GeminiPromptGenerator(BasePromptGenerator):
         if not self.api_key:
             raise ValueError("API key is required. Set GOOGLE_AI_API_KEY environment variable")
         
-        # Initialize the Gemini client
-        self.client = genai.Client(api_key=self.api_key)
+        # Shared Gemini client (reuses connection pools across generators)
+        self.client = get_gemini_client(self.api_key)
         self.model = getattr(settings, 'gemini_model', DEFAULT_GEMINI_MODEL)
     
-    async def generate_prompt_from_image(self, image: Image.Image) -> str:
+    async def generate_prompt_from_image(
+        self,
+        image: Optional[Image.Image] = None,
+        image_bytes: Optional[bytes] = None,
+        mime_type: Optional[str] = None
+    ) -> str:
         """
         Generate a descriptive prompt from an image using Gemini AI
+        
+        When image_bytes and mime_type are given, the original encoded bytes are
+        sent inline instead of letting the SDK re-encode the PIL image.
         """
         try:
+            if image_bytes is not None and mime_type:
+                image_part = types.Part.from_bytes(data=image_bytes, mime_type=mime_type)
+            elif image is not None:
+                image_part = image
+            else:
+                raise ValueError("Either image or image_bytes with mime_type is required")
+            
             prompt_template = prompt_generator.image_to_prompt_template()
             prompt_content = [
-                image,
+                image_part,
                 prompt_template
             ]
             
-            # Generate content using Gemini
-            response = self.client.models.generate_content(
+            # Generate content using Gemini (async client, so the event loop
+            # stays free for concurrent thumbnail work and other requests)
+            response = await self.client.aio.models.generate_content(
                 model=self.model,
                 contents=prompt_content,
             )
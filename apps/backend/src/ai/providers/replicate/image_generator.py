@@ -4,14 +4,14 @@ Replicate Image Generator using FLUX.1-dev model
 
 import asyncio
 import os
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from io import BytesIO
 import base64
 import logging
 
 import replicate
 from PIL import Image
-from fastapi import HTTPException, UploadFile
+from fastapi import HTTPException
 
 from ...base.base_image_generator import BaseImageGenerator
 from ....db.config import settings
@@ -41,19 +41,15 @@ class ReplicateImageGenerator(BaseImageGenerator):
         # Default fallback models will be tried if the configured one fails
         self.model = os.getenv('REPLICATE_MODEL_NAME', 'black-forest-labs/flux-dev')
     
-    async def generate_from_image_and_text(self, image_file: UploadFile, prompt: str) -> Tuple[bytes, str]:
+    async def generate_from_image_and_text(
+        self, image_content: bytes, prompt: str, content_type: Optional[str] = None
+    ) -> Tuple[bytes, str]:
         """Async wrapper: runs sync Replicate API in thread pool to avoid blocking the event loop."""
-        return await asyncio.to_thread(self._sync_generate_from_image_and_text, image_file, prompt)
+        return await asyncio.to_thread(self._sync_generate_from_image_and_text, image_content, prompt)
 
-    def _sync_generate_from_image_and_text(self, image_file: UploadFile, prompt: str) -> Tuple[bytes, str]:
+    def _sync_generate_from_image_and_text(self, image_content: bytes, prompt: str) -> Tuple[bytes, str]:
         try:
-            # Read and process the uploaded image
-            image_content = image_file.file.read()
-            image_file.file.seek(0)  # Reset file pointer
-            
             # Replicate accepts images as file-like objects (BytesIO)
-            # Reset the file pointer and use BytesIO
-            image_file.file.seek(0)
             image_bytes_io = BytesIO(image_content)
             
             logger.info(f"Generating image with Replicate model {self.model}, prompt: {prompt[:100]}...")
@@ -200,12 +196,15 @@ class ReplicateImageGenerator(BaseImageGenerator):
                 detail=error_message
             )
     
-    async def generate_from_multiple_images_and_text(self, image_files: list, prompt: str) -> Tuple[bytes, str]:
+    async def generate_from_multiple_images_and_text(
+        self, images: List[Tuple[bytes, Optional[str]]], prompt: str
+    ) -> Tuple[bytes, str]:
         """Async wrapper. Replicate FLUX uses first image only."""
-        if not image_files or len(image_files) == 0:
+        if not images:
             raise HTTPException(
                 status_code=400,
                 detail="At least one image file is required"
             )
-        return await self.generate_from_image_and_text(image_files[0], prompt)
+        image_content, content_type = images[0]
+        return await self.generate_from_image_and_text(image_content, prompt, content_type)
 
@@ -4,14 +4,14 @@ Stability AI Image Generator using Stable Diffusion img2img
 
 import asyncio
 import os
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from io import BytesIO
 import base64
 import logging
 import requests
 
 from PIL import Image
-from fastapi import HTTPException, UploadFile
+from fastapi import HTTPException
 
 from ...base.base_image_generator import BaseImageGenerator
 from ....db.config import settings
@@ -122,16 +122,14 @@ class StabilityImageGenerator(BaseImageGenerator):
             logger.warning(f"Failed to resize image, using original: {str(e)}")
             return image_content
     
-    async def generate_from_image_and_text(self, image_file: UploadFile, prompt: str) -> Tuple[bytes, str]:
+    async def generate_from_image_and_text(
+        self, image_content: bytes, prompt: str, content_type: Optional[str] = None
+    ) -> Tuple[bytes, str]:
         """Async wrapper: runs sync Stability API in thread pool to avoid blocking the event loop."""
-        return await asyncio.to_thread(self._sync_generate_from_image_and_text, image_file, prompt)
+        return await asyncio.to_thread(self._sync_generate_from_image_and_text, image_content, prompt)
 
-    def _sync_generate_from_image_and_text(self, image_file: UploadFile, prompt: str) -> Tuple[bytes, str]:
+    def _sync_generate_from_image_and_text(self, image_content: bytes, prompt: str) -> Tuple[bytes, str]:
         try:
-            # Read image content
-            image_content = image_file.file.read()
-            image_file.file.seek(0)
-            
             # Resize image to allowed dimensions for SDXL v1 models
             image_content = self._resize_image_to_allowed_dimensions(image_content)
             
@@ -142,7 +140,7 @@ class StabilityImageGenerator(BaseImageGenerator):
             
             # Prepare multipart/form-data request
             files = {
-                "init_image": (image_file.filename or "image.png", image_content, "image/png")
+                "init_image": ("image.png", image_content, "image/png")
             }
             
             # Form data parameters for v1 API
@@ -306,11 +304,14 @@ class StabilityImageGenerator(BaseImageGenerator):
                 detail=f"Image generation failed: {str(e)}"
             )
     
-    async def generate_from_multiple_images_and_text(self, image_files: list, prompt: str) -> Tuple[bytes, str]:
+    async def generate_from_multiple_images_and_text(
+        self, images: List[Tuple[bytes, Optional[str]]], prompt: str
+    ) -> Tuple[bytes, str]:
         """Stability AI v1 uses first image only."""
-        if not image_files or len(image_files) == 0:
+        if not images:
             raise HTTPException(
                 status_code=400,
                 detail="At least one image file is required"
             )
-        return await self.generate_from_image_and_text(image_files[0], prompt)
+        image_content, content_type = images[0]
+        return await self.generate_from_image_and_text(image_content, prompt, content_type)
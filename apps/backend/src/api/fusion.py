@@ -3,7 +3,7 @@ from fastapi.responses import JSONResponse
 from typing import Optional
 import uuid
 from datetime import datetime
-import base64
+import pybase64
 import logging
 
 from ..services.prompt_to_image_service import prompt_to_image_service
@@ -56,7 +56,7 @@ async def generate_fusion(
         )
         
         # Convert image data to base64 for JSON response
-        generated_image_base64 = base64.b64encode(generated_image_data).decode('utf-8')
+        generated_image_base64 = pybase64.b64encode_as_string(generated_image_data)
         generated_image_data_url = f"data:{content_type};base64,{generated_image_base64}"
         
         # Generate unique ID for this request
@@ -1,13 +1,15 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from pydantic import BaseModel
 from typing import Optional
 import uuid
 from datetime import datetime
-import base64
+import pybase64
 import logging
 
 from ..services.prompt_to_image_service import prompt_to_image_service
 from ..services.prompt_service import prompt_service
+from ..utils.upload import get_upload_size
 from ..db.config import settings
 
 # Configure logging
@@ -28,6 +30,18 @@ class ImageGenerationResponse(BaseModel):
     estimated_completion_time: Optional[int] = None
 
 
+def _track_generation_failure(prompt_id: Optional[int], prompt: Optional[str]) -> None:
+    """Record a failed generation against its prompt, by ID or by prompt text"""
+    try:
+        if prompt_id:
+            prompt_service.track_failure_by_id(prompt_id)
+            logger.info(f"Tracked failure for prompt ID {prompt_id}")
+        elif prompt and prompt_service.track_failure(prompt):
+            logger.info(f"Tracked failure for prompt text (hash: {prompt[:50]}...)")
+    except Exception as track_error:
+        logger.warning(f"Failed to track prompt failure: {track_error}")
+
+
 @router.post("", response_model=ImageGenerationResponse)
 async def generate_image(
     prompt: str = Form(...),
@@ -109,42 +123,45 @@ async def generate_image(
                     detail=f"Invalid file type: {content_type_to_validate}. Allowed types: {', '.join(settings.allowed_image_types)}"
                 )
         
-        # Check file size
-        content = await image.read()
-        file_size = len(content)
+        # Check file size (from the spooled upload, without reading it into memory)
+        file_size = get_upload_size(image)
         max_size_mb = settings.max_file_size // (1024*1024)
         
         if file_size > settings.max_file_size:
             logger.warning(f"Validation failed: File too large ({file_size / (1024*1024):.2f}MB, max: {max_size_mb}MB)")
             raise HTTPException(
-                status_code=400,
+                status_code=413,
                 detail=f"Reference image too large. Maximum size is {max_size_mb}MB"
             )
         
-        # Reset file pointer for service
-        await image.seek(0)
-        
-        generated_image_data, content_type, reference_image_url = await prompt_to_image_service.generate_image_from_prompt(
+        generated_image_data, content_type, reference_image_url, from_cache = await prompt_to_image_service.generate_image_from_prompt(
             prompt=prompt,
             reference_image=image,
             provider=provider
         )
         
-        # Track usage for the prompt (only on successful generation)
+        # Track usage for the prompt (only on successful generation; cached
+        # responses did not run the model, so they don't count as a use)
         try:
-            if prompt_id:
+            if from_cache:
+                logger.debug("Generation served from cache - usage not counted")
+            elif prompt_id:
                 # Increment usage by ID
                 prompt_service.increment_usage_by_id(prompt_id)
                 logger.info(f"Successfully incremented usage count for prompt ID {prompt_id}")
-            elif prompt_service.exists_by_text(prompt):
-                # Fallback to text-based tracking if no prompt_id provided
+            else:
+                # Fallback to text-based tracking if no prompt_id provided; a single
+                # UPDATE that matches nothing for prompts that were never saved
                 model_name = provider or getattr(settings, 'gemini_model', 'gemini-2.5-flash-image')
-                prompt_service.update_prompt(prompt, model_name)
+                await asyncio.to_thread(prompt_service.record_usage, prompt, model_name)
         except Exception as usage_error:
             logger.warning(f"Failed to track prompt usage: {usage_error}")
         
+        # Let this caller save the prompt with the image it just received
+        prompt_to_image_service.remember_generation(image_id, generated_image_data, content_type)
+        
         # Convert image data to base64 for JSON response
-        generated_image_base64 = base64.b64encode(generated_image_data).decode('utf-8')
+        generated_image_base64 = pybase64.b64encode_as_string(generated_image_data)
         generated_image_data_url = f"data:{content_type};base64,{generated_image_base64}"
         
         response = ImageGenerationResponse(
@@ -166,31 +183,15 @@ async def generate_image(
         # Log the HTTP exception details before tracking failure
         logger.warning(f"HTTPException during image generation - status: {e.status_code}, detail: {e.detail}, prompt_id: {prompt_id}")
         
-        # Track failure for the prompt
-        try:
-            if prompt_id:
-                prompt_service.track_failure_by_id(prompt_id)
-                logger.info(f"Tracked failure for prompt ID {prompt_id}")
-            elif prompt and prompt_service.exists_by_text(prompt):
-                prompt_service.track_failure(prompt)
-                logger.info(f"Tracked failure for prompt text (hash: {prompt[:50]}...)")
-        except Exception as track_error:
-            logger.warning(f"Failed to track prompt failure: {track_error}")
+        # Track failure for the prompt in the threadpool so the error response isn't held up by the DB
+        asyncio.get_running_loop().run_in_executor(None, _track_generation_failure, prompt_id, prompt)
         
         raise e
     except Exception as e:
         logger.error(f"Error during image generation: {str(e)}", exc_info=True)
         
-        # Track failure for the prompt
-        try:
-            if prompt_id:
-                prompt_service.track_failure_by_id(prompt_id)
-                logger.info(f"Tracked failure for prompt ID {prompt_id}")
-            elif prompt and prompt_service.exists_by_text(prompt):
-                prompt_service.track_failure(prompt)
-                logger.info(f"Tracked failure for prompt text (hash: {prompt[:50]}...)")
-        except Exception as track_error:
-            logger.warning(f"Failed to track prompt failure: {track_error}")
+        # Track failure for the prompt in the threadpool so the error response isn't held up by the DB
+        asyncio.get_running_loop().run_in_executor(None, _track_generation_failure, prompt_id, prompt)
         
         # Only log full traceback, but return user-friendly message
         raise HTTPException(
@@ -3,10 +3,12 @@ from fastapi.responses import JSONResponse
 from typing import Optional, List
 import uuid
 from datetime import datetime
-import base64
+import pybase64
 import logging
 
 from ..services.grouping_service import grouping_service
+from ..services.prompt_service import prompt_service
+from ..utils.upload import get_upload_size
 from ..db.config import settings
 
 logger = logging.getLogger(__name__)
@@ -88,20 +90,15 @@ async def generate_grouping(
                         detail=f"Image {idx + 1} has invalid file type: {content_type_to_validate}. Allowed types: {', '.join(settings.allowed_image_types)}"
                     )
             
-            # Check file size
-            content = await image.read()
-            file_size = len(content)
+            # Check file size (from the spooled upload, without reading it into memory)
             max_size_mb = settings.max_file_size // (1024*1024)
-            
+            file_size = get_upload_size(image)
             if file_size > settings.max_file_size:
-                logger.warning(f"Validation failed: Image {idx + 1} too large ({file_size / (1024*1024):.2f}MB, max: {max_size_mb}MB)")
+                logger.warning(f"Upload rejected - filename: {image.filename}, {file_size} bytes exceeds {settings.max_file_size}")
                 raise HTTPException(
-                    status_code=400,
+                    status_code=413,
                     detail=f"Image {idx + 1} too large. Maximum size is {max_size_mb}MB"
                 )
-            
-            # Reset file pointer for service
-            await image.seek(0)
         
         # Generate grouping using dedicated grouping service
         generated_image_data, content_type, reference_image_url = await grouping_service.generate_from_images(
@@ -114,14 +111,13 @@ async def generate_grouping(
         try:
             if prompt_id:
                 # Increment usage by ID
-                from ..services.prompt_service import prompt_service
                 prompt_service.increment_usage_by_id(prompt_id)
                 logger.info(f"Successfully incremented usage count for prompt ID {prompt_id}")
         except Exception as usage_error:
             logger.warning(f"Failed to track prompt usage: {usage_error}")
         
         # Convert image data to base64 for JSON response
-        generated_image_base64 = base64.b64encode(generated_image_data).decode('utf-8')
+        generated_image_base64 = pybase64.b64encode_as_string(generated_image_data)
         generated_image_data_url = f"data:{content_type};base64,{generated_image_base64}"
         
         # Generate unique ID for this request
@@ -145,7 +141,6 @@ async def generate_grouping(
         # Track failure for the prompt
         try:
             if prompt_id:
-                from ..services.prompt_service import prompt_service
                 prompt_service.track_failure_by_id(prompt_id)
         except Exception:
             pass
@@ -157,7 +152,6 @@ async def generate_grouping(
         # Track failure for the prompt
         try:
             if prompt_id:
-                from ..services.prompt_service import prompt_service
                 prompt_service.track_failure_by_id(prompt_id)
         except Exception:
             pass
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from typing import Optional
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import logging
 
 from ..services.image_to_prompt_service import image_to_prompt_service
@@ -11,7 +11,7 @@ router = APIRouter(prefix="/inspire", tags=["inspire"])
 
 # Service is already initialized globally
 
-@router.post("/generate-prompt")
+@router.post("/generate-prompt", response_class=ORJSONResponse)
 async def generate_prompt_from_image(
     file: UploadFile = File(...),
     provider: Optional[str] = Form(None)
@@ -28,7 +28,7 @@ async def generate_prompt_from_image(
             file=file,
             provider=provider
         )
-        return JSONResponse(content=result)
+        return ORJSONResponse(content=result)
         
     except HTTPException:
         raise
@@ -1,12 +1,14 @@
 """
 API endpoints for prompt management
 """
+import asyncio
 import logging
 from fastapi import APIRouter, HTTPException, Query, Path, Form, Body
 from fastapi.responses import Response
 from typing import Optional, List
 
 from ..services.prompt_service import prompt_service
+from ..services.prompt_to_image_service import prompt_to_image_service
 from ..ai.factory import ImageGeneratorFactory
 from ..db.config import settings
 from ..schemas.prompt import (
@@ -19,7 +21,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/prompts", tags=["prompts"])
 
 @router.get("/", response_model=PromptListResponse)
-async def get_prompts(
+def get_prompts(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(50, ge=1, le=100, description="Items per page"),
     model: Optional[str] = Query(None, description="Filter by model"),
@@ -46,7 +48,7 @@ async def get_prompts(
         raise HTTPException(status_code=500, detail="Failed to retrieve prompts")
 
 @router.get("/search", response_model=List[PromptResponse])
-async def search_prompts(
+def search_prompts(
     query: str = Query(..., min_length=1, max_length=500, description="Search query"),
     limit: int = Query(20, ge=1, le=10000, description="Maximum results")
 ):
@@ -58,7 +60,7 @@ async def search_prompts(
         raise HTTPException(status_code=500, detail="Search failed")
 
 @router.get("/popular", response_model=List[PromptResponse])
-async def get_popular_prompts(
+def get_popular_prompts(
     limit: int = Query(50, ge=1, le=10000, description="Maximum results"),
     model: Optional[str] = Query(None, description="Filter by model")
 ):
@@ -70,7 +72,7 @@ async def get_popular_prompts(
         raise HTTPException(status_code=500, detail="Failed to retrieve popular prompts")
 
 @router.get("/recent", response_model=List[PromptResponse])
-async def get_recent_prompts(
+def get_recent_prompts(
     limit: int = Query(50, ge=1, le=10000, description="Maximum results"),
     model: Optional[str] = Query(None, description="Filter by model")
 ):
@@ -82,7 +84,7 @@ async def get_recent_prompts(
         raise HTTPException(status_code=500, detail="Failed to retrieve recent prompts")
 
 @router.get("/most-failed", response_model=List[PromptResponse])
-async def get_most_failed_prompts(
+def get_most_failed_prompts(
     limit: int = Query(50, ge=1, le=10000, description="Maximum results"),
     model: Optional[str] = Query(None, description="Filter by model")
 ):
@@ -94,7 +96,7 @@ async def get_most_failed_prompts(
         raise HTTPException(status_code=500, detail="Failed to retrieve most failed prompts")
 
 @router.get("/zero-used", response_model=List[PromptResponse])
-async def get_zero_used_prompts(
+def get_zero_used_prompts(
     limit: int = Query(50, ge=1, le=10000, description="Maximum results"),
     model: Optional[str] = Query(None, description="Filter by model")
 ):
@@ -106,7 +108,7 @@ async def get_zero_used_prompts(
         raise HTTPException(status_code=500, detail="Failed to retrieve zero used prompts")
 
 @router.get("/health")
-async def health_check():
+def health_check():
     """Health check for prompts API"""
     try:
         stats = prompt_service.get_stats()
@@ -125,7 +127,7 @@ async def health_check():
         }
 
 @router.get("/{prompt_id}", response_model=PromptResponse)
-async def get_prompt(
+def get_prompt(
     prompt_id: int = Path(..., description="Prompt ID")
 ):
     """Get a specific prompt by ID"""
@@ -141,23 +143,20 @@ async def get_prompt(
         raise HTTPException(status_code=500, detail="Failed to retrieve prompt")
 
 @router.get("/{prompt_id}/thumbnail")
-async def get_prompt_thumbnail(
+def get_prompt_thumbnail(
     prompt_id: int = Path(..., description="Prompt ID")
 ):
     """Get thumbnail image for a prompt"""
     try:
-        thumbnail_data = prompt_service.get_thumbnail(prompt_id)
-        if not thumbnail_data:
-            raise HTTPException(status_code=404, detail="Thumbnail not found")
-        
-        # Get prompt info to determine MIME type
-        prompt = prompt_service.get_prompt(prompt_id)
-        if not prompt or not prompt.thumbnail_mime:
+        # Blob and MIME type come from one narrow query
+        thumbnail = prompt_service.get_thumbnail_with_mime(prompt_id)
+        if not thumbnail:
             raise HTTPException(status_code=404, detail="Thumbnail not found")
+        thumbnail_data, thumbnail_mime = thumbnail
         
         return Response(
             content=thumbnail_data,
-            media_type=prompt.thumbnail_mime,
+            media_type=thumbnail_mime,
             headers={"Cache-Control": "public, max-age=3600"}
         )
     except HTTPException:
@@ -167,7 +166,7 @@ async def get_prompt_thumbnail(
         raise HTTPException(status_code=500, detail="Failed to retrieve thumbnail")
 
 @router.get("/{prompt_id}/full", response_model=PromptWithThumbnail)
-async def get_prompt_with_thumbnail(
+def get_prompt_with_thumbnail(
     prompt_id: int = Path(..., description="Prompt ID")
 ):
     """Get prompt with thumbnail data included"""
@@ -183,7 +182,7 @@ async def get_prompt_with_thumbnail(
         raise HTTPException(status_code=500, detail="Failed to retrieve prompt")
 
 @router.get("/stats/overview", response_model=PromptStats)
-async def get_prompt_stats():
+def get_prompt_stats():
     """Get database statistics"""
     try:
         return prompt_service.get_stats()
@@ -192,7 +191,7 @@ async def get_prompt_stats():
         raise HTTPException(status_code=500, detail="Failed to retrieve statistics")
 
 @router.patch("/{prompt_id}", response_model=PromptResponse)
-async def update_prompt(
+def update_prompt(
     prompt_id: int = Path(..., description="Prompt ID"),
     prompt_text: str = Body(..., embed=True, min_length=1, max_length=5000, description="New prompt text")
 ):
@@ -211,7 +210,7 @@ async def update_prompt(
         raise HTTPException(status_code=500, detail="Failed to update prompt")
 
 @router.delete("/{prompt_id}")
-async def delete_prompt(
+def delete_prompt(
     prompt_id: int = Path(..., description="Prompt ID")
 ):
     """Delete a prompt"""
@@ -228,23 +227,35 @@ async def delete_prompt(
 
 @router.post("/save", response_model=PromptResponse)
 async def save_prompt(
-    prompt: str = Form(..., description="Prompt text to save")
+    prompt: str = Form(..., description="Prompt text to save"),
+    generation_id: Optional[str] = Form(None, description="ID of the caller's generation to use as the thumbnail")
 ):
     """Save a prompt to the database with generated thumbnail"""
     try:
-        # Always generate thumbnail from prompt text
+        # Existing prompts keep their thumbnail and only count another use.
+        # New prompts saved with the id of the caller's own recent generation
+        # reuse that image as the thumbnail; otherwise one is generated from the
+        # prompt text
         thumbnail_data = None
-        try:
-            # Use default provider for thumbnail generation
-            default_provider = getattr(settings, 'default_ai_provider', 'gemini')
-            generator = ImageGeneratorFactory.create(default_provider)
-            thumbnail_data, _ = await generator.generate_from_text(prompt)
-        except Exception as gen_error:
-            logger.warning(f"Failed to generate thumbnail: {gen_error}")
-            # Continue without thumbnail - attempt_save_prompt handles None thumbnail_data
+        if not await asyncio.to_thread(prompt_service.exists_by_text, prompt):
+            recent_image = None
+            if generation_id:
+                recent_image = prompt_to_image_service.get_recent_image(generation_id)
+            if recent_image is not None:
+                thumbnail_data, _ = recent_image
+            else:
+                try:
+                    # Use default provider for thumbnail generation
+                    default_provider = getattr(settings, 'default_ai_provider', 'gemini')
+                    generator = ImageGeneratorFactory.get_or_create(default_provider)
+                    thumbnail_data, _ = await generator.generate_from_text(prompt)
+                except Exception as gen_error:
+                    logger.warning(f"Failed to generate thumbnail: {gen_error}")
+                    # Continue without thumbnail - attempt_save_prompt handles None thumbnail_data
         
-        # Save prompt using existing service logic
-        saved_prompt = prompt_service.attempt_save_prompt(prompt, thumbnail_data)
+        # Save prompt using existing service logic; the thumbnail encode and
+        # upsert are blocking, so keep them off the event loop
+        saved_prompt = await asyncio.to_thread(prompt_service.attempt_save_prompt, prompt, thumbnail_data)
         
         if not saved_prompt:
             raise HTTPException(status_code=500, detail="Failed to save prompt")
@@ -258,7 +269,7 @@ async def save_prompt(
         raise HTTPException(status_code=500, detail=f"Failed to save prompt: {str(e)}")
 
 @router.post("/cleanup")
-async def cleanup_old_prompts(
+def cleanup_old_prompts(
     days: int = Query(90, ge=1, le=365, description="Delete prompts older than this many days")
 ):
     """Clean up old prompts without thumbnails"""
@@ -0,0 +1,28 @@
+"""
+API endpoint for serving uploaded reference images
+"""
+import logging
+from fastapi import APIRouter, HTTPException, Path
+from fastapi.responses import Response
+
+from ..services.reference_image_service import reference_image_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/reference", tags=["reference"])
+
+@router.get("/{reference_id}")
+async def get_reference_image(
+    reference_id: str = Path(..., description="Reference image ID")
+):
+    """Get a reference image uploaded for a recent generation"""
+    reference = reference_image_service.get(reference_id)
+    if not reference:
+        raise HTTPException(status_code=404, detail="Reference image not found or expired")
+    image_data, content_type = reference
+    
+    return Response(
+        content=image_data,
+        media_type=content_type,
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
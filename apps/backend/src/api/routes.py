@@ -6,6 +6,7 @@ from .variations import router as variations_router
 from .fusion import router as fusion_router
 from .teleport import router as teleport_router
 from .grouping import router as grouping_router
+from .reference import router as reference_router
 
 # Create main API router
 api_router = APIRouter(prefix="/api", tags=["api"])
@@ -18,6 +19,7 @@ api_router.include_router(variations_router)
 api_router.include_router(fusion_router)
 api_router.include_router(teleport_router)
 api_router.include_router(grouping_router)
+api_router.include_router(reference_router)
 
 # Health check endpoint
 @api_router.get("/health")
@@ -46,6 +48,7 @@ async def root():
             "fusion": "/api/fusion",
             "teleport": "/api/teleport",
             "grouping": "/api/grouping",
+            "reference": "/api/reference",
             "docs": "/api/docs"
         }
     }
@@ -7,6 +7,7 @@ and make maintenance easier.
 
 # AI Model Configuration
 DEFAULT_GEMINI_MODEL = "gemini-2.5-flash-image"
+GEMINI_HTTP_TIMEOUT_MS = 120_000  # Per-request timeout for the shared Gemini client; image generation can be slow
 
 # Application Configuration
 APP_NAME = "ImageGenAI"
@@ -23,6 +24,34 @@ DEFAULT_ALLOWED_IMAGE_TYPES = [
     "image/webp"
 ]
 
+# Image types the AI providers accept as raw inline bytes (no re-encode needed)
+INLINE_IMAGE_MIME_TYPES = frozenset({
+    "image/jpeg",
+    "image/png",
+    "image/webp"
+})
+MAX_INLINE_IMAGE_SIZE = 7 * 1024 * 1024  # 7MB, keeps the request under Gemini's inline payload limit
+MAX_IMAGE_PIXELS = 50_000_000  # Decompression-bomb guard for uploaded images (~7000x7000)
+VISION_MAX_EDGE = 1024  # Longest edge sent to Gemini for image-to-prompt; larger adds tiles, not detail
+KNOWN_PROMPT_CACHE_SIZE = 1024  # Prompt hashes remembered as existing, to skip repeat existence queries
+STATS_CACHE_TTL_SECONDS = 30  # How long prompt statistics are served from memory
+THUMBNAIL_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Stored prompt thumbnails kept in memory (32MB)
+THUMBNAIL_ENCODE_CACHE_MAX_BYTES = 8 * 1024 * 1024  # Encoded thumbnails kept in memory, keyed by source image hash (8MB)
+THUMBNAIL_WEBP_METHOD = 4  # libwebp effort; within a few percent of 6 in size at about half the encode time
+COUNTER_FLUSH_INTERVAL_SECONDS = 0.2  # Usage/failure counter deltas are written in batches this often
+COUNTER_FLUSH_MAX_PENDING = 256  # ...or as soon as this many prompts have pending deltas
+PROMPT_CACHE_SIZE = 256  # Image-to-prompt results kept in memory, keyed by image content hash
+REFERENCE_IMAGE_TTL_SECONDS = 3600  # How long uploaded reference images stay fetchable after generation
+REFERENCE_IMAGE_CACHE_MAX_BYTES = 128 * 1024 * 1024  # Uploaded reference images kept in memory (128MB)
+GENERATION_CACHE_TTL_SECONDS = 600  # Repeat prompt + image generations served from memory for this long
+GENERATION_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Generated images kept in memory for repeat requests (64MB)
+RECENT_GENERATIONS_TTL_SECONDS = 600  # How long a generation can be reused as the thumbnail when its caller saves the prompt
+RECENT_GENERATIONS_MAX_BYTES = 64 * 1024 * 1024  # Generated images kept in memory by response id for saving (64MB)
+
+# Database Configuration
+DB_POOL_MIN_CONNECTIONS = 1
+DB_POOL_MAX_CONNECTIONS = 10
+
 # Server Configuration
 DEFAULT_HOST = "0.0.0.0"
 DEFAULT_PORT = 8000
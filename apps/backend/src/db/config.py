@@ -55,6 +55,15 @@ class Settings(BaseSettings):
     replicate_api_key: Optional[str] = None
     stability_ai_api_key: Optional[str] = None
     
+    # Keep uploaded reference images fetchable at /api/reference/{id}; when off,
+    # responses carry only a content-hash identifier for the reference image
+    serve_reference_images: bool = True
+    
+    # Serve repeat prompt + reference image requests from a short-lived in-memory
+    # cache. Off by default: generation is non-deterministic, and resubmitting is
+    # how users ask for a different result
+    cache_generations: bool = False
+    
     # File Upload Configuration
     max_file_size: int = DEFAULT_MAX_FILE_SIZE
     allowed_image_types: Union[list, str] = DEFAULT_ALLOWED_IMAGE_TYPES
@@ -5,10 +5,15 @@ import os
 import psycopg2
 import psycopg2.extras
 import psycopg2.errors
+import psycopg2.pool
 import logging
+import threading
 from contextlib import contextmanager
 from typing import Generator
 
+from ..models.prompt import Prompt
+from ..constants import DB_POOL_MIN_CONNECTIONS, DB_POOL_MAX_CONNECTIONS
+
 logger = logging.getLogger(__name__)
 
 class DatabaseConnection:
@@ -18,6 +23,15 @@ class DatabaseConnection:
         self.database_url = database_url or os.getenv("DATABASE_URL")
         if not self.database_url:
             raise ValueError("DATABASE_URL environment variable is required")
+        # Reuse connections instead of paying TCP + auth setup on every query.
+        # The pool raises when exhausted, so callers wait on the semaphore instead.
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            DB_POOL_MIN_CONNECTIONS,
+            DB_POOL_MAX_CONNECTIONS,
+            self.database_url,
+            cursor_factory=psycopg2.extras.RealDictCursor
+        )
+        self._pool_slots = threading.BoundedSemaphore(DB_POOL_MAX_CONNECTIONS)
         self._init_database()
     
     def _init_database(self):
@@ -73,26 +87,50 @@ class DatabaseConnection:
                 conn.rollback()
                 logger.warning(f"Error creating indexes (may already exist): {e}")
             
+            # Rehash rows still keyed by the legacy 64-char SHA-256 prompt_hash
+            try:
+                with conn.cursor() as rehash_cursor:
+                    rehash_cursor.execute("SELECT id, prompt_text FROM prompts WHERE LENGTH(prompt_hash) = 64")
+                    rows = rehash_cursor.fetchall()
+                    if rows:
+                        psycopg2.extras.execute_batch(
+                            rehash_cursor,
+                            "UPDATE prompts SET prompt_hash = %s WHERE id = %s",
+                            [(Prompt.hash_prompt(row['prompt_text']), row['id']) for row in rows]
+                        )
+                        conn.commit()
+                        logger.info(f"Rehashed {len(rows)} prompts to xxh3-128")
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Could not rehash legacy prompt hashes: {e}")
+            
             logger.info("Database initialized")
     
     @contextmanager
     def get_connection(self) -> Generator[psycopg2.extensions.connection, None, None]:
-        """Get database connection with proper error handling"""
+        """Get a pooled database connection with proper error handling"""
         conn = None
+        self._pool_slots.acquire()
         try:
-            conn = psycopg2.connect(
-                self.database_url,
-                cursor_factory=psycopg2.extras.RealDictCursor
-            )
+            conn = self._pool.getconn()
             yield conn
         except psycopg2.Error as e:
             logger.error(f"Database error: {e}")
-            if conn:
-                conn.rollback()
             raise
         finally:
             if conn:
-                conn.close()
+                self._release(conn)
+            self._pool_slots.release()
+    
+    def _release(self, conn: psycopg2.extensions.connection) -> None:
+        """Return a connection to the pool, ending any open transaction first"""
+        discard = bool(conn.closed)
+        if not discard:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        self._pool.putconn(conn, close=discard)
 
 # Global database connection
 db_connection = DatabaseConnection()
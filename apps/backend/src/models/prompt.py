@@ -3,11 +3,19 @@ Prompt data models
 """
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
-import hashlib
 import unicodedata
 import re
 
+import xxhash
+
+@lru_cache(maxsize=1024)
+def _hash_prompt_text(prompt: str) -> str:
+    """Hash a prompt's normalized text; cached because one save hashes the same text several times"""
+    normalized = Prompt.normalize_prompt(prompt)
+    return xxhash.xxh3_128_hexdigest(normalized.encode('utf-8'))
+
 @dataclass
 class Prompt:
     """Prompt data model"""
@@ -43,9 +51,8 @@ class Prompt:
     
     @classmethod
     def hash_prompt(cls, prompt: str) -> str:
-        """Generate SHA256 hash for normalized prompt"""
-        normalized = cls.normalize_prompt(prompt)
-        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        """Generate xxh3-128 hash for normalized prompt (dedup key, not a security hash)"""
+        return _hash_prompt_text(prompt)
     
     def __post_init__(self):
         """Auto-generate hash if not provided"""
@@ -2,10 +2,10 @@
 Prompt repository for database operations
 """
 import logging
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
 
 import psycopg2
+import psycopg2.extras
 
 from ..db.connection import db_connection
 from ..models.prompt import Prompt
@@ -17,12 +17,13 @@ class PromptRepository:
     
     def create(self, prompt: Prompt) -> Prompt:
         """Create a new prompt"""
-        logger.info(f"Starting create for prompt - hash: {prompt.prompt_hash[:8]}..., text: '{prompt.prompt_text[:50]}{'...' if len(prompt.prompt_text) > 50 else ''}', model: {prompt.model}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Starting create for prompt - hash: %s..., text: '%.50s%s', model: %s", prompt.prompt_hash[:8], prompt.prompt_text, '...' if len(prompt.prompt_text) > 50 else '', prompt.model)
         
         try:
             with db_connection.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    logger.debug(f"Creating new prompt with hash: {prompt.prompt_hash}")
+                    logger.debug("Creating new prompt with hash: %s", prompt.prompt_hash)
                     cursor.execute("""
                         INSERT INTO prompts (
                             prompt_text, prompt_hash, model,
@@ -43,54 +44,89 @@ class PromptRepository:
                     ))
                     result = cursor.fetchone()
                     prompt.id = result['id']
-                    logger.info(f"Successfully created new prompt - ID: {prompt.id}, hash: {prompt.prompt_hash[:8]}..., total_uses: {prompt.total_uses}")
+                    logger.info("Successfully created new prompt - ID: %s, hash: %s..., total_uses: %s", prompt.id, prompt.prompt_hash[:8], prompt.total_uses)
                     conn.commit()
-                    logger.debug(f"Database transaction committed for new prompt - ID: {prompt.id}")
+                    logger.debug("Database transaction committed for new prompt - ID: %s", prompt.id)
                     return prompt
                     
         except Exception as e:
-            logger.error(f"Error in create for prompt - hash: {prompt.prompt_hash[:8]}..., error: {str(e)}")
+            logger.error("Error in create for prompt - hash: %s..., error: %s", prompt.prompt_hash[:8], e)
             raise
     
-    def update(self, prompt: Prompt) -> Prompt:
-        """Update an existing prompt (only updates usage stats, no thumbnail modification)"""
-        logger.info(f"Starting update for prompt - hash: {prompt.prompt_hash[:8]}..., text: '{prompt.prompt_text[:50]}{'...' if len(prompt.prompt_text) > 50 else ''}', model: {prompt.model}")
+    def update(self, prompt: Prompt) -> Optional[Prompt]:
+        """Update an existing prompt (only updates usage stats, no thumbnail modification); None if it does not exist"""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Starting update for prompt - hash: %s..., text: '%.50s%s', model: %s", prompt.prompt_hash[:8], prompt.prompt_text, '...' if len(prompt.prompt_text) > 50 else '', prompt.model)
         
         try:
             with db_connection.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    logger.debug(f"Updating existing prompt with hash: {prompt.prompt_hash}")
+                    logger.debug("Updating existing prompt with hash: %s", prompt.prompt_hash)
+                    # Update and read back in one round-trip (no separate exists check)
                     cursor.execute("""
                         UPDATE prompts 
                         SET total_uses = total_uses + 1,
                             last_used_at = CURRENT_TIMESTAMP
                         WHERE prompt_hash = %s
+                        RETURNING id, prompt_text, prompt_hash, total_uses, total_fails,
+                                  first_used_at, last_used_at, model,
+                                  thumbnail_mime, thumbnail_width, thumbnail_height
                     """, (prompt.prompt_hash,))
+                    row = cursor.fetchone()
                     
-                    if cursor.rowcount > 0:
-                        # Record was updated, get the updated record
-                        logger.info(f"Successfully updated existing prompt - hash: {prompt.prompt_hash[:8]}..., rows affected: {cursor.rowcount}")
-                        cursor.execute("""
-                            SELECT * FROM prompts WHERE prompt_hash = %s
-                        """, (prompt.prompt_hash,))
-                        row = cursor.fetchone()
-                        if row:
-                            updated_prompt = self._row_to_prompt(row)
-                            logger.info(f"Retrieved updated prompt - ID: {updated_prompt.id}, total_uses: {updated_prompt.total_uses}, last_used_at: {updated_prompt.last_used_at}")
-                            conn.commit()
-                            logger.debug(f"Database transaction committed for updated prompt - ID: {updated_prompt.id}")
-                            return updated_prompt
-                        else:
-                            logger.error(f"Failed to retrieve updated prompt after update - hash: {prompt.prompt_hash}")
-                            conn.rollback()
-                            return prompt
-                    else:
-                        logger.warning(f"No prompt found to update with hash: {prompt.prompt_hash}")
+                    if row is None:
+                        logger.debug("No prompt found to update with hash: %s", prompt.prompt_hash)
                         conn.rollback()
-                        return prompt
+                        return None
+                    
+                    updated_prompt = self._row_to_prompt(row)
+                    conn.commit()
+                    logger.info("Successfully updated existing prompt - ID: %s, total_uses: %s, last_used_at: %s", updated_prompt.id, updated_prompt.total_uses, updated_prompt.last_used_at)
+                    return updated_prompt
                     
         except Exception as e:
-            logger.error(f"Error in update for prompt - hash: {prompt.prompt_hash[:8]}..., error: {str(e)}")
+            logger.error("Error in update for prompt - hash: %s..., error: %s", prompt.prompt_hash[:8], e)
+            raise
+
+    def upsert(self, prompt: Prompt) -> Prompt:
+        """Insert a new prompt, or count another use of an existing one, in a single statement"""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Starting upsert for prompt - hash: %s..., text: '%.50s%s', model: %s", prompt.prompt_hash[:8], prompt.prompt_text, '...' if len(prompt.prompt_text) > 50 else '', prompt.model)
+        
+        try:
+            with db_connection.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    # Existing rows keep their thumbnail and model; only usage stats change
+                    cursor.execute("""
+                        INSERT INTO prompts (
+                            prompt_text, prompt_hash, model,
+                            thumbnail_data, thumbnail_mime, thumbnail_width, thumbnail_height,
+                            total_uses, total_fails
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (prompt_hash) DO UPDATE
+                        SET total_uses = prompts.total_uses + 1,
+                            last_used_at = CURRENT_TIMESTAMP
+                        RETURNING id, prompt_text, prompt_hash, total_uses, total_fails,
+                                  first_used_at, last_used_at, model,
+                                  thumbnail_mime, thumbnail_width, thumbnail_height
+                    """, (
+                        prompt.prompt_text,
+                        prompt.prompt_hash,
+                        prompt.model,
+                        prompt.thumbnail_data,
+                        prompt.thumbnail_mime,
+                        prompt.thumbnail_width,
+                        prompt.thumbnail_height,
+                        prompt.total_uses,
+                        prompt.total_fails
+                    ))
+                    saved_prompt = self._row_to_prompt(cursor.fetchone())
+                    conn.commit()
+                    logger.info("Successfully upserted prompt - ID: %s, hash: %s..., total_uses: %s", saved_prompt.id, saved_prompt.prompt_hash[:8], saved_prompt.total_uses)
+                    return saved_prompt
+                    
+        except Exception as e:
+            logger.error("Error in upsert for prompt - hash: %s..., error: %s", prompt.prompt_hash[:8], e)
             raise
 
     def update_text_by_id(self, prompt_id: int, prompt_text: str, prompt_hash: str) -> Optional[Prompt]:
@@ -114,12 +150,12 @@ class PromptRepository:
         except psycopg2.IntegrityError:
             raise
         except Exception as e:
-            logger.error(f"Error updating prompt text by ID {prompt_id}: {str(e)}")
+            logger.error("Error updating prompt text by ID %s: %s", prompt_id, e)
             raise
 
     def increment_usage_by_id(self, prompt_id: int) -> bool:
         """Increment usage count for a prompt by ID"""
-        logger.info(f"Incrementing usage count for prompt - ID: {prompt_id}")
+        logger.info("Incrementing usage count for prompt - ID: %s", prompt_id)
         
         try:
             with db_connection.get_connection() as conn:
@@ -132,20 +168,20 @@ class PromptRepository:
                     """, (prompt_id,))
                     
                     if cursor.rowcount > 0:
-                        logger.info(f"Successfully incremented usage count - ID: {prompt_id}, rows affected: {cursor.rowcount}")
+                        logger.info("Successfully incremented usage count - ID: %s, rows affected: %s", prompt_id, cursor.rowcount)
                         conn.commit()
                         return True
                     else:
-                        logger.warning(f"No prompt found to increment usage for ID: {prompt_id}")
+                        logger.warning("No prompt found to increment usage for ID: %s", prompt_id)
                         return False
                     
         except Exception as e:
-            logger.error(f"Error incrementing usage for prompt - ID: {prompt_id}, error: {str(e)}")
+            logger.error("Error incrementing usage for prompt - ID: %s, error: %s", prompt_id, e)
             raise
     
     def increment_failures_by_id(self, prompt_id: int) -> bool:
         """Increment failure count for a prompt by ID"""
-        logger.info(f"Incrementing failure count for prompt - ID: {prompt_id}")
+        logger.info("Incrementing failure count for prompt - ID: %s", prompt_id)
         
         try:
             with db_connection.get_connection() as conn:
@@ -158,20 +194,34 @@ class PromptRepository:
                     """, (prompt_id,))
                     
                     if cursor.rowcount > 0:
-                        logger.info(f"Successfully incremented failure count - ID: {prompt_id}, rows affected: {cursor.rowcount}")
+                        logger.info("Successfully incremented failure count - ID: %s, rows affected: %s", prompt_id, cursor.rowcount)
                         conn.commit()
                         return True
                     else:
-                        logger.warning(f"No prompt found to increment failures for ID: {prompt_id}")
+                        logger.warning("No prompt found to increment failures for ID: %s", prompt_id)
                         return False
                     
         except Exception as e:
-            logger.error(f"Error incrementing failures for prompt - ID: {prompt_id}, error: {str(e)}")
+            logger.error("Error incrementing failures for prompt - ID: %s, error: %s", prompt_id, e)
             raise
     
+    def apply_counter_deltas(self, deltas: List[Tuple[int, int, int]]) -> None:
+        """Apply batched (prompt_id, uses_delta, fails_delta) counter updates in one transaction"""
+        with db_connection.get_connection() as conn:
+            with conn.cursor() as cursor:
+                psycopg2.extras.execute_batch(cursor, """
+                    UPDATE prompts
+                    SET total_uses = total_uses + %s,
+                        total_fails = total_fails + %s,
+                        last_used_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                """, [(uses, fails, prompt_id) for prompt_id, uses, fails in deltas])
+                conn.commit()
+                logger.info("Applied batched counter updates - prompts: %s", len(deltas))
+    
     def increment_failures(self, prompt_hash: str) -> bool:
         """Increment failure count for a prompt"""
-        logger.info(f"Incrementing failure count for prompt - hash: {prompt_hash[:8]}...")
+        logger.info("Incrementing failure count for prompt - hash: %s...", prompt_hash[:8])
         
         try:
             with db_connection.get_connection() as conn:
@@ -184,15 +234,15 @@ class PromptRepository:
                     """, (prompt_hash,))
                     
                     if cursor.rowcount > 0:
-                        logger.info(f"Successfully incremented failure count - hash: {prompt_hash[:8]}..., rows affected: {cursor.rowcount}")
+                        logger.info("Successfully incremented failure count - hash: %s..., rows affected: %s", prompt_hash[:8], cursor.rowcount)
                         conn.commit()
                         return True
                     else:
-                        logger.warning(f"No prompt found to increment failures for hash: {prompt_hash}")
+                        logger.debug("No prompt found to increment failures for hash: %s", prompt_hash)
                         return False
                     
         except Exception as e:
-            logger.error(f"Error incrementing failures for prompt - hash: {prompt_hash[:8]}..., error: {str(e)}")
+            logger.error("Error incrementing failures for prompt - hash: %s..., error: %s", prompt_hash[:8], e)
             raise
     
     def get_by_id(self, prompt_id: int) -> Optional[Prompt]:
@@ -213,9 +263,13 @@ class PromptRepository:
     
     def exists_by_prompt(self, prompt: Prompt) -> bool:
         """Check if prompt already exists by Prompt object"""
+        return self.exists_by_hash(prompt.prompt_hash)
+    
+    def exists_by_hash(self, prompt_hash: str) -> bool:
+        """Check if a prompt with this hash already exists"""
         with db_connection.get_connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT 1 FROM prompts WHERE prompt_hash = %s", (prompt.prompt_hash,))
+                cursor.execute("SELECT 1 FROM prompts WHERE prompt_hash = %s", (prompt_hash,))
                 row = cursor.fetchone()
                 return row is not None
     
@@ -352,55 +406,53 @@ class PromptRepository:
                 row = cursor.fetchone()
                 return row['thumbnail_data'] if row and row.get('thumbnail_data') else None
     
+    def get_thumbnail_with_mime(self, prompt_id: int) -> Optional[Tuple[bytes, str]]:
+        """Get thumbnail data and its MIME type in one query (only the columns needed to serve it)"""
+        with db_connection.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT thumbnail_data, thumbnail_mime FROM prompts WHERE id = %s", (prompt_id,))
+                row = cursor.fetchone()
+                if not row or not row['thumbnail_data'] or not row['thumbnail_mime']:
+                    return None
+                return row['thumbnail_data'], row['thumbnail_mime']
+    
     def get_stats(self) -> Dict[str, Any]:
-        """Get database statistics"""
+        """Get database statistics (aggregates and top prompts in a single query)"""
         with db_connection.get_connection() as conn:
             with conn.cursor() as cursor:
-                # Total prompts
-                cursor.execute("SELECT COUNT(*) as count FROM prompts")
-                total_prompts = cursor.fetchone()['count']
-                
-                # Total uses
-                cursor.execute("SELECT SUM(total_uses) as total FROM prompts")
-                total_uses = cursor.fetchone()['total'] or 0
-                
-                # Total failures
-                cursor.execute("SELECT SUM(total_fails) as total FROM prompts")
-                total_fails = cursor.fetchone()['total'] or 0
-                
-                # Prompts with thumbnails
-                cursor.execute("SELECT COUNT(*) as count FROM prompts WHERE thumbnail_data IS NOT NULL")
-                prompts_with_thumbnails = cursor.fetchone()['count']
-                
-                # Most popular prompt
                 cursor.execute("""
-                    SELECT prompt_text, total_uses 
-                    FROM prompts 
-                    ORDER BY total_uses DESC 
-                    LIMIT 1
+                    SELECT
+                        totals.total_prompts,
+                        totals.total_uses,
+                        totals.total_fails,
+                        totals.prompts_with_thumbnails,
+                        popular.prompt_text AS most_popular_prompt,
+                        COALESCE(popular.total_uses, 0) AS most_popular_uses,
+                        failed.prompt_text AS most_failed_prompt,
+                        COALESCE(failed.total_fails, 0) AS most_failed_count
+                    FROM (
+                        SELECT
+                            COUNT(*) AS total_prompts,
+                            COALESCE(SUM(total_uses), 0) AS total_uses,
+                            COALESCE(SUM(total_fails), 0) AS total_fails,
+                            COUNT(thumbnail_data) AS prompts_with_thumbnails
+                        FROM prompts
+                    ) totals
+                    LEFT JOIN LATERAL (
+                        SELECT prompt_text, total_uses
+                        FROM prompts
+                        ORDER BY total_uses DESC
+                        LIMIT 1
+                    ) popular ON TRUE
+                    LEFT JOIN LATERAL (
+                        SELECT prompt_text, total_fails
+                        FROM prompts
+                        WHERE total_fails > 0
+                        ORDER BY total_fails DESC
+                        LIMIT 1
+                    ) failed ON TRUE
                 """)
-                most_popular = cursor.fetchone()
-                
-                # Most failed prompt
-                cursor.execute("""
-                    SELECT prompt_text, total_fails 
-                    FROM prompts 
-                    WHERE total_fails > 0
-                    ORDER BY total_fails DESC 
-                    LIMIT 1
-                """)
-                most_failed = cursor.fetchone()
-                
-                return {
-                    "total_prompts": total_prompts,
-                    "total_uses": total_uses,
-                    "total_fails": total_fails,
-                    "prompts_with_thumbnails": prompts_with_thumbnails,
-                    "most_popular_prompt": most_popular['prompt_text'] if most_popular else None,
-                    "most_popular_uses": most_popular['total_uses'] if most_popular else 0,
-                    "most_failed_prompt": most_failed['prompt_text'] if most_failed else None,
-                    "most_failed_count": most_failed['total_fails'] if most_failed else 0
-                }
+                return dict(cursor.fetchone())
     
     def delete(self, prompt_id: int) -> bool:
         """Delete a prompt"""
@@ -425,57 +477,15 @@ class PromptRepository:
                 return cursor.rowcount
     
     def _row_to_prompt(self, row) -> Prompt:
-        """Convert database row to Prompt model"""
-        # Handle cases where thumbnail_data might not be in the SELECT (for performance)
-        # psycopg2 RealDictCursor uses dict-like access
-        # Helper to safely get value from row
-        def safe_get(key, default=None):
-            if row and key in row:
-                try:
-                    value = row[key]
-                    return value if value is not None else default
-                except (KeyError, IndexError):
-                    return default
-            return default
-        
-        thumbnail_data = safe_get('thumbnail_data')
-        
-        first_used_at = safe_get('first_used_at')
-        if first_used_at:
-            # PostgreSQL returns datetime objects directly, but handle string conversion if needed
-            if isinstance(first_used_at, str):
-                try:
-                    first_used_at = datetime.fromisoformat(first_used_at.replace('Z', '+00:00'))
-                except (ValueError, TypeError):
-                    first_used_at = None
-            elif not isinstance(first_used_at, datetime):
-                first_used_at = None
-        
-        last_used_at = safe_get('last_used_at')
-        if last_used_at:
-            # PostgreSQL returns datetime objects directly, but handle string conversion if needed
-            if isinstance(last_used_at, str):
-                try:
-                    last_used_at = datetime.fromisoformat(last_used_at.replace('Z', '+00:00'))
-                except (ValueError, TypeError):
-                    last_used_at = None
-            elif not isinstance(last_used_at, datetime):
-                last_used_at = None
+        """
+        Convert database row to Prompt model
         
-        return Prompt(
-            id=row['id'],
-            prompt_text=row['prompt_text'],
-            prompt_hash=row['prompt_hash'],
-            total_uses=row['total_uses'],
-            total_fails=safe_get('total_fails', 0),
-            first_used_at=first_used_at,
-            last_used_at=last_used_at,
-            model=safe_get('model'),
-            thumbnail_data=thumbnail_data,
-            thumbnail_mime=safe_get('thumbnail_mime'),
-            thumbnail_width=safe_get('thumbnail_width'),
-            thumbnail_height=safe_get('thumbnail_height')
-        )
+        Column names match the Prompt fields and every NOT NULL / TIMESTAMP column
+        already arrives typed from psycopg2, so the row maps straight onto the
+        dataclass. Columns left out of a SELECT (e.g. thumbnail_data in list
+        queries) keep their dataclass defaults.
+        """
+        return Prompt(**row)
 
 # Global repository instance
 prompt_repository = PromptRepository()
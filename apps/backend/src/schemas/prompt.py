@@ -1,7 +1,7 @@
 """
 Pydantic schemas for prompt API
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import Optional, List
 from datetime import datetime
 
@@ -28,8 +28,10 @@ class PromptResponse(BaseModel):
     thumbnail_width: Optional[int]
     thumbnail_height: Optional[int]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Validates a whole result list in one pydantic-core pass
+PromptResponseList = TypeAdapter(List[PromptResponse])
 
 class PromptWithThumbnail(PromptResponse):
     """Schema for prompt with thumbnail data"""
@@ -6,6 +6,7 @@ person images and a text prompt. Keeps grouping logic separate from
 single-image prompt-to-image generation.
 """
 
+import asyncio
 import logging
 from typing import Tuple, Optional, List
 
@@ -13,6 +14,7 @@ from fastapi import HTTPException, UploadFile
 
 from ..ai.factory import ImageGeneratorFactory
 from ..db.config import settings
+from .reference_image_service import reference_image_service
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,8 @@ GROUPING_FACE_PRESERVATION_NOTE = (
     "the second image is the second person, and so on. Each person in the generated image "
     "must look like their corresponding reference photo—do not alter or replace their faces."
 )
+# Prebuilt once so each request only needs a single join with the user prompt
+GROUPING_FACE_PRESERVATION_NOTE_STRIPPED = GROUPING_FACE_PRESERVATION_NOTE.strip()
 
 
 class GroupingService:
@@ -31,7 +35,7 @@ class GroupingService:
     def _get_generator(self, provider: Optional[str] = None):
         """Get the image generator for the given provider (defaults to settings)."""
         provider = provider or getattr(settings, "default_ai_provider", "gemini")
-        return ImageGeneratorFactory.create(provider)
+        return ImageGeneratorFactory.get_or_create(provider)
 
     async def generate_from_images(
         self,
@@ -55,14 +59,14 @@ class GroupingService:
         """
         try:
             generator = self._get_generator(provider)
-            reference_image_url = generator.process_reference_image(images[0])
+            # Read each upload once; the same bytes feed the reference store and the generator
+            contents = await asyncio.gather(*(image.read() for image in images))
+            image_uploads = [(content, image.content_type) for content, image in zip(contents, images)]
+            reference_image_url = reference_image_service.store(image_uploads[0][0], images[0].filename)
 
-            for image in images:
-                image.file.seek(0)
-
-            prompt_with_note = (prompt.strip() + GROUPING_FACE_PRESERVATION_NOTE).strip()
+            prompt_with_note = f"{prompt.strip()} {GROUPING_FACE_PRESERVATION_NOTE_STRIPPED}"
             generated_image_data, content_type = await generator.generate_from_multiple_images_and_text(
-                images, prompt_with_note
+                image_uploads, prompt_with_note
             )
             return generated_image_data, content_type, reference_image_url
 
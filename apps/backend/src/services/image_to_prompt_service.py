@@ -5,26 +5,46 @@ Service layer that handles business logic for generating prompts from images.
 Uses the AI generator classes for the actual AI operations.
 """
 
+import asyncio
 import logging
 import base64
-from typing import Tuple, Optional
+from typing import Optional, Tuple
 from fastapi import HTTPException, UploadFile
-from PIL import Image
+from PIL import Image, ImageOps
 import io
+from collections import OrderedDict
+import xxhash
 
 from ..ai.factory import PromptGeneratorFactory
 from ..utils.thumbnail import ThumbnailGenerator
+from ..utils.upload import read_upload_limited, sniff_image_mime, IMAGE_SNIFF_LENGTH
 from .prompt_service import prompt_service
 from ..db.config import settings
+from ..constants import INLINE_IMAGE_MIME_TYPES, MAX_INLINE_IMAGE_SIZE, MAX_IMAGE_PIXELS, PROMPT_CACHE_SIZE, VISION_MAX_EDGE
 
 logger = logging.getLogger(__name__)
 
+# Exact image MIME types accepted for prompt generation
+_ALLOWED_MIME_TYPES = frozenset({
+    "image/jpeg",
+    "image/jpg",
+    "image/png",
+    "image/webp",
+    "image/gif"
+})
+
+# JPEG draft target when the decoded image only feeds the 150px thumbnail
+# (twice the thumbnail size keeps LANCZOS downscaling sharp)
+_THUMBNAIL_DRAFT_SIZE = (300, 300)
+
 
 class ImageToPromptService:
     """Service for handling image to prompt generation business logic"""
     
     def __init__(self):
         self.prompt_service = prompt_service
+        # Gemini prompts by image content hash, so re-uploads skip the API call
+        self._prompt_cache: "OrderedDict[str, str]" = OrderedDict()
     
     def _get_generator(self, provider: Optional[str] = None):
         """
@@ -41,7 +61,88 @@ class ImageToPromptService:
         """
         # Prompt generation only supports gemini, so always use gemini
         # regardless of the provider parameter
-        return PromptGeneratorFactory.create('gemini')
+        return PromptGeneratorFactory.get_or_create('gemini')
+    
+    def _get_cached_prompt(self, key: str) -> Optional[str]:
+        """Return a previously generated prompt for this image hash, if any"""
+        prompt = self._prompt_cache.get(key)
+        if prompt is not None:
+            self._prompt_cache.move_to_end(key)
+        return prompt
+    
+    def _cache_prompt(self, key: str, prompt: str) -> None:
+        """Remember a generated prompt, evicting the least recently used entry when full"""
+        self._prompt_cache[key] = prompt
+        self._prompt_cache.move_to_end(key)
+        if len(self._prompt_cache) > PROMPT_CACHE_SIZE:
+            self._prompt_cache.popitem(last=False)
+    
+    async def _prompt_exists(self, prompt: str) -> bool:
+        """Check whether a prompt is already saved (lookup failures count as new)"""
+        try:
+            return await asyncio.to_thread(self.prompt_service.exists_by_text, prompt)
+        except Exception as e:
+            logger.error(f"Failed to check prompt existence: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _duplicate_response(prompt: str, filename: Optional[str]) -> dict:
+        """Response for a prompt that is already saved (clients only display the thumbnail on success)"""
+        return {
+            "success": False,
+            "message": "Prompt already exists in database",
+            "prompt": prompt,
+            "style": "photorealistic",
+            "thumbnail": None,
+            "original_filename": filename,
+            "prompt_id": None,
+            "saved_to_database": False
+        }
+    
+    @staticmethod
+    def _decode_image(contents: bytes, inline_allowed: bool) -> Tuple[Image.Image, bool]:
+        """
+        Decode uploaded bytes into a PIL image (CPU-bound, run off the event loop)
+        
+        RGB conversion is left to the consumers so it runs once, on the smallest
+        image that needs it (the thumbnail converts after downscaling). Palette
+        and bilevel images are converted here since they cannot be resampled smoothly.
+        
+        Args:
+            contents: Raw image bytes
+            inline_allowed: Whether the format and size allow sending the original bytes
+            
+        Returns:
+            Tuple[Image.Image, bool]: The decoded image, and whether the original
+                bytes should be sent to Gemini (only when already small enough)
+        """
+        image = Image.open(io.BytesIO(contents))
+        # Reject decompression bombs from the header, before any pixels are decoded
+        width, height = image.size
+        if width * height > MAX_IMAGE_PIXELS:
+            raise ValueError(f"image has {width}x{height} pixels, more than the {MAX_IMAGE_PIXELS} allowed")
+        send_inline = inline_allowed and max(image.size) <= VISION_MAX_EDGE
+        # Let libjpeg decode at a reduced scale: only the thumbnail needs the
+        # pixels when sending inline, otherwise the vision-sized copy (no-op
+        # for other formats)
+        if send_inline:
+            image.draft('RGB', _THUMBNAIL_DRAFT_SIZE)
+        else:
+            image.draft('RGB', (VISION_MAX_EDGE, VISION_MAX_EDGE))
+        if image.mode in ('P', '1'):
+            image = image.convert('RGB')
+        else:
+            image.load()
+        return image, send_inline
+    
+    @staticmethod
+    def _prepare_for_vision(image: Image.Image) -> Image.Image:
+        """Shrink an image to VISION_MAX_EDGE (never enlarging) and convert it to RGB for Gemini"""
+        if max(image.size) > VISION_MAX_EDGE:
+            image = ImageOps.contain(image, (VISION_MAX_EDGE, VISION_MAX_EDGE), Image.Resampling.LANCZOS)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return image
     
     async def generate_prompt_from_image(
         self,
@@ -62,72 +163,125 @@ class ImageToPromptService:
             HTTPException: If generation fails
         """
         # Note: Prompt generation always uses gemini, regardless of provider parameter
-        logger.info(f"Starting prompt generation - filename: {file.filename}, using provider: gemini (provider parameter '{provider}' ignored for prompt generation)")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Starting prompt generation - filename: {file.filename}, provider parameter '{provider}' ignored (gemini)")
         
         try:
             # Validate file type
-            if not file.content_type or not file.content_type.startswith('image/'):
-                raise HTTPException(status_code=400, detail="File must be an image")
+            mime_type = (file.content_type or '').lower()
+            if mime_type not in _ALLOWED_MIME_TYPES:
+                raise HTTPException(status_code=400, detail="Unsupported image type")
             
             # Read and validate image
-            contents = await file.read()
-            try:
-                image = Image.open(io.BytesIO(contents))
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Invalid image file: {str(e)}")
-            
-            # Get generator and generate prompt from image using AI
-            generator = self._get_generator(provider)
-            prompt = await generator.generate_prompt_from_image(
-                image=image
+            max_size_mb = settings.max_file_size // (1024*1024)
+            contents = await read_upload_limited(
+                file,
+                settings.max_file_size,
+                detail=f"Image too large. Maximum size is {max_size_mb}MB"
             )
             
-            # Validate prompt length
-            if len(prompt) > 5000:
-                prompt = prompt[:5000].rsplit(' ', 1)[0]
+            # Cheap header check before paying for a full decode. The sniffed
+            # type is authoritative for what gets sent to the AI provider.
+            sniffed_mime = sniff_image_mime(contents[:IMAGE_SNIFF_LENGTH])
+            if sniffed_mime is None:
+                raise HTTPException(status_code=400, detail="Invalid image file: unrecognized image format")
+            if sniffed_mime != mime_type.replace('image/jpg', 'image/jpeg'):
+                logger.debug(f"Declared content type {mime_type} does not match sniffed {sniffed_mime} - filename: {file.filename}")
+            mime_type = sniffed_mime
             
-            # Generate thumbnail
-            thumbnail_data = ThumbnailGenerator.generate_thumbnail_from_pil_image(image)
+            # Small images in supported formats are forwarded as the original
+            # bytes, in which case the decoded image only feeds the thumbnail
+            inline_allowed = mime_type in INLINE_IMAGE_MIME_TYPES and len(contents) <= MAX_INLINE_IMAGE_SIZE
+            
+            # Identical uploads reuse the earlier Gemini result. Its prompt has
+            # usually been saved already, so that is checked before any PIL work
+            cache_key = xxhash.xxh3_128_hexdigest(contents)
+            cached_prompt = self._get_cached_prompt(cache_key)
+            if cached_prompt is not None and await self._prompt_exists(cached_prompt):
+                return self._duplicate_response(cached_prompt, file.filename)
             
-            # Save the prompt to the database
             try:
-                if self.prompt_service.exists_by_text(prompt):
-                    return {
-                        "success": False,
-                        "message": "Prompt already exists in database",
-                        "prompt": prompt,
-                        "style": "photorealistic",
-                        "thumbnail": f"data:image/webp;base64,{base64.b64encode(thumbnail_data).decode('utf-8')}",
-                        "original_filename": file.filename,
-                        "prompt_id": None,
-                        "saved_to_database": False
-                    }
+                image, send_inline = await asyncio.to_thread(
+                    self._decode_image,
+                    contents,
+                    inline_allowed
+                )
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Invalid image file: {str(e)}")
+            
+            if cached_prompt is not None:
+                prompt = cached_prompt
+                thumbnail_data = await asyncio.to_thread(
+                    ThumbnailGenerator.generate_thumbnail_from_pil_image, image
+                )
+            else:
+                # Get generator and generate prompt from image using AI. The
+                # thumbnail is built in a worker thread while Gemini responds.
+                generator = self._get_generator(provider)
+                if send_inline:
+                    prompt_coro = generator.generate_prompt_from_image(
+                        image_bytes=contents,
+                        mime_type=mime_type
+                    )
                 else:
-                    # Use provider name or default model name for database
-                    model_name = provider or getattr(settings, 'gemini_model', 'gemini-2.5-flash-image')
-                    saved_prompt = self.prompt_service.create_prompt(
-                        prompt_text=prompt,
-                        model=model_name,
-                        image_data=thumbnail_data
+                    # Larger images are downscaled first: beyond this size Gemini
+                    # bills more tiles without describing the image any better
+                    image = await asyncio.to_thread(self._prepare_for_vision, image)
+                    prompt_coro = generator.generate_prompt_from_image(
+                        image=image
                     )
-                    prompt_id = saved_prompt.id
+                thumbnail_coro = asyncio.to_thread(
+                    ThumbnailGenerator.generate_thumbnail_from_pil_image, image
+                )
+                prompt, thumbnail_data = await asyncio.gather(prompt_coro, thumbnail_coro)
+                
+                # Validate prompt length
+                if len(prompt) > 5000:
+                    prompt = prompt[:5000].rsplit(' ', 1)[0]
+                
+                self._cache_prompt(cache_key, prompt)
+                
+                if await self._prompt_exists(prompt):
+                    return self._duplicate_response(prompt, file.filename)
+            
+            # Save the prompt to the database (thumbnail encode + INSERT run in a
+            # worker thread so they don't stall other requests on the event loop)
+            saved_prompt = None
+            try:
+                # Use provider name or default model name for database
+                model_name = provider or getattr(settings, 'gemini_model', 'gemini-2.5-flash-image')
+                saved_prompt = await asyncio.to_thread(
+                    self.prompt_service.create_prompt,
+                    prompt_text=prompt,
+                    model=model_name,
+                    image_data=thumbnail_data
+                )
+                prompt_id = saved_prompt.id
             except Exception as e:
                 logger.error(f"Failed to save prompt to database: {str(e)}")
                 prompt_id = None
             
+            # Point at the stored thumbnail (cacheable, no base64 in the JSON);
+            # inline it only when it could not be stored
+            if saved_prompt is not None and saved_prompt.thumbnail_mime:
+                thumbnail = f"/api/prompts/{prompt_id}/thumbnail"
+            else:
+                thumbnail = "data:image/webp;base64," + base64.b64encode(thumbnail_data).decode('ascii')
+            
             result = {
                 "success": True,
                 "prompt": prompt,
                 "style": "photorealistic",
-                "thumbnail": f"data:image/webp;base64,{base64.b64encode(thumbnail_data).decode('utf-8')}",
+                "thumbnail": thumbnail,
                 "original_filename": file.filename,
                 "prompt_id": prompt_id,
                 "saved_to_database": prompt_id is not None
             }
             
-            logger.info(f"Prompt generation completed - prompt_id: {prompt_id}, saved: {prompt_id is not None}")
+            logger.info(
+                "Prompt generation completed - filename: %s, bytes: %d, prompt_length: %d, prompt_id: %s, saved: %s",
+                file.filename, len(contents), len(prompt), prompt_id, prompt_id is not None
+            )
             return result
             
         except HTTPException:
@@ -1,9 +1,12 @@
 """
 Prompt service for business logic
 """
+import atexit
 import logging
-import tempfile
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
 import psycopg2
@@ -11,14 +14,35 @@ import psycopg2
 from ..models.prompt import Prompt
 from ..repositories.prompt_repository import prompt_repository
 from ..utils.thumbnail import ThumbnailGenerator
-from ..schemas.prompt import PromptResponse, PromptWithThumbnail, PromptStats
+from ..utils.cache import BytesLRUCache
+from ..schemas.prompt import PromptResponse, PromptResponseList, PromptWithThumbnail, PromptStats
 from ..db.config import settings
+from ..constants import (
+    KNOWN_PROMPT_CACHE_SIZE, STATS_CACHE_TTL_SECONDS, THUMBNAIL_CACHE_MAX_BYTES,
+    COUNTER_FLUSH_INTERVAL_SECONDS, COUNTER_FLUSH_MAX_PENDING
+)
 
 logger = logging.getLogger(__name__)
 
 class PromptService:
     """Service for prompt business logic"""
     
+    def __init__(self):
+        # Hashes of prompts known to exist. Only positive results are kept, so
+        # they just need dropping when rows disappear or change their text.
+        self._known_hashes: "OrderedDict[str, None]" = OrderedDict()
+        # Writes can run in worker threads (asyncio.to_thread) while reads run on the loop
+        self._known_hashes_lock = threading.Lock()
+        # (monotonic timestamp, stats) for the polled stats endpoint
+        self._stats_cache: Optional[Tuple[float, PromptStats]] = None
+        # Stored thumbnails by prompt id (thumbnails never change once written)
+        self._thumbnail_cache = BytesLRUCache(THUMBNAIL_CACHE_MAX_BYTES)
+        # Usage/failure deltas per prompt id, written in batches by _flush_counters
+        self._pending_counters: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+        self._counters_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        atexit.register(self._flush_counters)
+    
     def create_prompt(
         self,
         prompt_text: str,
@@ -36,34 +60,18 @@ class PromptService:
             
             # Generate thumbnail if image is provided (only for create)
             if image_data:
-                thumbnail_result = self._generate_thumbnail(image_data)
-                if thumbnail_result["success"]:
-                    prompt.thumbnail_data = thumbnail_result["thumbnail_data"]
-                    prompt.thumbnail_mime = thumbnail_result["mime_type"]
-                    prompt.thumbnail_width = thumbnail_result["width"]
-                    prompt.thumbnail_height = thumbnail_result["height"]
-                else:
-                    logger.warning(f"Failed to generate thumbnail: {thumbnail_result['error']}")
+                self._attach_thumbnail(prompt, image_data)
             
             saved_prompt = prompt_repository.create(prompt)
-            response = PromptResponse(
-                id=saved_prompt.id,
-                prompt_text=saved_prompt.prompt_text,
-                prompt_hash=saved_prompt.prompt_hash,
-                total_uses=saved_prompt.total_uses,
-                total_fails=saved_prompt.total_fails,
-                first_used_at=saved_prompt.first_used_at,
-                last_used_at=saved_prompt.last_used_at,
-                model=saved_prompt.model,
-                thumbnail_mime=saved_prompt.thumbnail_mime,
-                thumbnail_width=saved_prompt.thumbnail_width,
-                thumbnail_height=saved_prompt.thumbnail_height
-            )
+            self._remember_hash(saved_prompt.prompt_hash)
+            if saved_prompt.thumbnail_data and saved_prompt.thumbnail_mime:
+                self._thumbnail_cache.put(saved_prompt.id, saved_prompt.thumbnail_data, saved_prompt.thumbnail_mime)
+            response = PromptResponse.model_validate(saved_prompt)
             
             return response
             
         except Exception as e:
-            logger.error(f"Failed to create prompt - error: {str(e)}", exc_info=True)
+            logger.error("Failed to create prompt - error: %s", e, exc_info=True)
             raise
     
     def update_prompt(
@@ -78,49 +86,34 @@ class PromptService:
                 model=model
             )
             
-            # Check if prompt exists before attempting update
-            if not prompt_repository.exists_by_prompt(prompt):
+            saved_prompt = prompt_repository.update(prompt)
+            if saved_prompt is None:
                 raise ValueError(f"Prompt with text '{prompt_text[:50]}{'...' if len(prompt_text) > 50 else ''}' does not exist and cannot be updated")
             
-            saved_prompt = prompt_repository.update(prompt)
-            response = PromptResponse(
-                id=saved_prompt.id,
-                prompt_text=saved_prompt.prompt_text,
-                prompt_hash=saved_prompt.prompt_hash,
-                total_uses=saved_prompt.total_uses,
-                total_fails=saved_prompt.total_fails,
-                first_used_at=saved_prompt.first_used_at,
-                last_used_at=saved_prompt.last_used_at,
-                model=saved_prompt.model,
-                thumbnail_mime=saved_prompt.thumbnail_mime,
-                thumbnail_width=saved_prompt.thumbnail_width,
-                thumbnail_height=saved_prompt.thumbnail_height
-            )
+            response = PromptResponse.model_validate(saved_prompt)
             
             return response
             
         except Exception as e:
-            logger.error(f"Failed to update prompt - error: {str(e)}", exc_info=True)
+            logger.error("Failed to update prompt - error: %s", e, exc_info=True)
             raise
     
+    def record_usage(self, prompt_text: str, model: Optional[str] = None) -> bool:
+        """Count a use of a saved prompt in one UPDATE; returns False if the prompt is not saved"""
+        prompt = Prompt(prompt_text=prompt_text, model=model)
+        updated = prompt_repository.update(prompt)
+        if updated is None:
+            return False
+        self._remember_hash(updated.prompt_hash)
+        return True
+    
     def get_prompt(self, prompt_id: int) -> Optional[PromptResponse]:
         """Get prompt by ID"""
         prompt = prompt_repository.get_by_id(prompt_id)
         if not prompt:
             return None
         
-        return PromptResponse(
-            id=prompt.id,
-            prompt_text=prompt.prompt_text,
-            prompt_hash=prompt.prompt_hash,
-            total_uses=prompt.total_uses,
-            first_used_at=prompt.first_used_at,
-            last_used_at=prompt.last_used_at,
-            model=prompt.model,
-            thumbnail_mime=prompt.thumbnail_mime,
-            thumbnail_width=prompt.thumbnail_width,
-            thumbnail_height=prompt.thumbnail_height
-        )
+        return PromptResponse.model_validate(prompt)
 
     def update_prompt_text(self, prompt_id: int, prompt_text: str) -> Optional[PromptResponse]:
         """Update prompt text by ID. Returns updated PromptResponse or None if not found.
@@ -135,21 +128,11 @@ class PromptService:
             updated = prompt_repository.update_text_by_id(prompt_id, text, new_hash)
         except psycopg2.IntegrityError:
             raise ValueError("A prompt with this text already exists")
+        # The old hash is gone; the cache does not know which one it was
+        self._forget_hashes()
         if not updated:
             return None
-        return PromptResponse(
-            id=updated.id,
-            prompt_text=updated.prompt_text,
-            prompt_hash=updated.prompt_hash,
-            total_uses=updated.total_uses,
-            total_fails=updated.total_fails,
-            first_used_at=updated.first_used_at,
-            last_used_at=updated.last_used_at,
-            model=updated.model,
-            thumbnail_mime=updated.thumbnail_mime,
-            thumbnail_width=updated.thumbnail_width,
-            thumbnail_height=updated.thumbnail_height
-        )
+        return PromptResponse.model_validate(updated)
     
     def get_prompt_with_thumbnail(self, prompt_id: int) -> Optional[PromptWithThumbnail]:
         """Get prompt with thumbnail data"""
@@ -157,19 +140,7 @@ class PromptService:
         if not prompt:
             return None
         
-        return PromptWithThumbnail(
-            id=prompt.id,
-            prompt_text=prompt.prompt_text,
-            prompt_hash=prompt.prompt_hash,
-            total_uses=prompt.total_uses,
-            first_used_at=prompt.first_used_at,
-            last_used_at=prompt.last_used_at,
-            model=prompt.model,
-            thumbnail_mime=prompt.thumbnail_mime,
-            thumbnail_width=prompt.thumbnail_width,
-            thumbnail_height=prompt.thumbnail_height,
-            thumbnail_data=prompt.thumbnail_data
-        )
+        return PromptWithThumbnail.model_validate(prompt)
     
     def get_recent_prompts(
         self,
@@ -178,7 +149,7 @@ class PromptService:
     ) -> List[PromptResponse]:
         """Get recent prompts"""
         prompts = prompt_repository.get_recent(limit, model)
-        return [self._prompt_to_response(prompt) for prompt in prompts]
+        return PromptResponseList.validate_python(prompts, from_attributes=True)
     
     def get_popular_prompts(
         self,
@@ -187,7 +158,7 @@ class PromptService:
     ) -> List[PromptResponse]:
         """Get popular prompts"""
         prompts = prompt_repository.get_popular(limit, model)
-        return [self._prompt_to_response(prompt) for prompt in prompts]
+        return PromptResponseList.validate_python(prompts, from_attributes=True)
     
     def get_most_failed_prompts(
         self,
@@ -196,7 +167,7 @@ class PromptService:
     ) -> List[PromptResponse]:
         """Get most failed prompts"""
         prompts = prompt_repository.get_most_failed(limit, model)
-        return [self._prompt_to_response(prompt) for prompt in prompts]
+        return PromptResponseList.validate_python(prompts, from_attributes=True)
     
     def get_zero_used_prompts(
         self,
@@ -205,30 +176,60 @@ class PromptService:
     ) -> List[PromptResponse]:
         """Get prompts with zero usage"""
         prompts = prompt_repository.get_zero_used(limit, model)
-        return [self._prompt_to_response(prompt) for prompt in prompts]
+        return PromptResponseList.validate_python(prompts, from_attributes=True)
     
     def search_prompts(self, query: str, limit: int = 20) -> List[PromptResponse]:
         """Search prompts"""
         prompts = prompt_repository.search(query, limit)
-        return [self._prompt_to_response(prompt) for prompt in prompts]
+        return PromptResponseList.validate_python(prompts, from_attributes=True)
     
     def get_thumbnail(self, prompt_id: int) -> Optional[bytes]:
         """Get thumbnail data"""
         return prompt_repository.get_thumbnail(prompt_id)
     
+    def get_thumbnail_with_mime(self, prompt_id: int) -> Optional[Tuple[bytes, str]]:
+        """Get thumbnail data with its MIME type, served from memory after the first read"""
+        cached = self._thumbnail_cache.get(prompt_id)
+        if cached is not None:
+            return cached
+        
+        thumbnail = prompt_repository.get_thumbnail_with_mime(prompt_id)
+        if thumbnail is not None:
+            self._thumbnail_cache.put(prompt_id, *thumbnail)
+        return thumbnail
+    
     def get_stats(self) -> PromptStats:
-        """Get database statistics"""
-        stats_data = prompt_repository.get_stats()
-        return PromptStats(**stats_data)
+        """Get database statistics, cached briefly since dashboards poll this"""
+        cached = self._stats_cache
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < STATS_CACHE_TTL_SECONDS:
+            return cached[1]
+        
+        stats = PromptStats(**prompt_repository.get_stats())
+        self._stats_cache = (now, stats)
+        return stats
     
     def delete_prompt(self, prompt_id: int) -> bool:
         """Delete a prompt"""
-        return prompt_repository.delete(prompt_id)
+        deleted = prompt_repository.delete(prompt_id)
+        if deleted:
+            self._forget_hashes()
+            self._stats_cache = None
+            self._thumbnail_cache.pop(prompt_id)
+        return deleted
     
     def exists_by_text(self, prompt_text: str) -> bool:
-        """Check if a prompt exists by its text using the existing exists_by_prompt method"""
-        temp_prompt = Prompt(prompt_text=prompt_text)
-        return prompt_repository.exists_by_prompt(temp_prompt)
+        """Check if a prompt exists by its text, answering repeats for known prompts from memory"""
+        prompt_hash = Prompt.hash_prompt(prompt_text)
+        with self._known_hashes_lock:
+            if prompt_hash in self._known_hashes:
+                self._known_hashes.move_to_end(prompt_hash)
+                return True
+        
+        exists = prompt_repository.exists_by_hash(prompt_hash)
+        if exists:
+            self._remember_hash(prompt_hash)
+        return exists
     
     def attempt_save_prompt(self, prompt_text: str, thumbnail_data: Optional[bytes] = None) -> Optional[PromptResponse]:
         """
@@ -243,50 +244,109 @@ class PromptService:
             PromptResponse if successful, None if failed
         """
         try:
-            if self.exists_by_text(prompt_text):
-                return self.update_prompt(prompt_text, settings.gemini_model)
-            else:
-                return self.create_prompt(
-                    prompt_text=prompt_text,
-                    model=settings.gemini_model,
-                    image_data=thumbnail_data,
-                    total_uses=1
-                )
+            prompt = Prompt(
+                prompt_text=prompt_text,
+                model=settings.gemini_model,
+                total_uses=1
+            )
+            # Existing rows keep their thumbnail (the upsert leaves it untouched), so
+            # callers only pass thumbnail_data for prompts they know to be new
+            if thumbnail_data:
+                self._attach_thumbnail(prompt, thumbnail_data)
+            
+            # One INSERT ... ON CONFLICT round-trip instead of exists + create/update
+            saved_prompt = prompt_repository.upsert(prompt)
+            self._remember_hash(saved_prompt.prompt_hash)
+            return PromptResponse.model_validate(saved_prompt)
         except Exception as db_error:
-            logger.error(f"Failed to save prompt to database: {db_error}", exc_info=True)
+            logger.error("Failed to save prompt to database: %s", db_error, exc_info=True)
             return None
     
     def cleanup_old_prompts(self, days: int = 90) -> int:
         """Clean up old prompts without thumbnails"""
-        return prompt_repository.cleanup_old(days)
+        removed = prompt_repository.cleanup_old(days)
+        if removed:
+            self._forget_hashes()
+            self._stats_cache = None
+        return removed
     
     def increment_usage_by_id(self, prompt_id: int) -> bool:
-        """Increment usage count for a prompt by ID"""
-        try:
-            return prompt_repository.increment_usage_by_id(prompt_id)
-        except Exception as e:
-            logger.error(f"Error incrementing usage for prompt ID {prompt_id} - error: {str(e)}", exc_info=True)
-            return False
+        """Queue a usage count increment for a prompt by ID (written in the next batch)"""
+        self._queue_counter(prompt_id, 0)
+        return True
     
     def track_failure_by_id(self, prompt_id: int) -> bool:
-        """Track a failure for a prompt by ID"""
-        try:
-            return prompt_repository.increment_failures_by_id(prompt_id)
-        except Exception as e:
-            logger.error(f"Error tracking failure for prompt ID {prompt_id} - error: {str(e)}", exc_info=True)
-            return False
+        """Queue a failure count increment for a prompt by ID (written in the next batch)"""
+        self._queue_counter(prompt_id, 1)
+        return True
     
     def track_failure(self, prompt_text: str) -> bool:
         """Track a failure for a prompt"""
         try:
-            prompt = Prompt(prompt_text=prompt_text)
-            success = prompt_repository.increment_failures(prompt.prompt_hash)
-            return success
+            return prompt_repository.increment_failures(Prompt.hash_prompt(prompt_text))
             
         except Exception as e:
-            logger.error(f"Error tracking failure for prompt - error: {str(e)}", exc_info=True)
+            logger.error("Error tracking failure for prompt - error: %s", e, exc_info=True)
             return False
     
+    def _queue_counter(self, prompt_id: int, index: int) -> None:
+        """Add one to a pending counter (0 = uses, 1 = fails) and schedule a flush"""
+        with self._counters_lock:
+            self._pending_counters[prompt_id][index] += 1
+            # A full batch is flushed right away, but still on the timer thread:
+            # callers include async handlers that must not block on the database
+            if len(self._pending_counters) >= COUNTER_FLUSH_MAX_PENDING:
+                delay = 0
+            else:
+                delay = COUNTER_FLUSH_INTERVAL_SECONDS
+            if self._flush_timer is None or delay < self._flush_timer.interval:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                self._flush_timer = threading.Timer(delay, self._flush_counters)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def _flush_counters(self) -> None:
+        """Write all pending counter deltas in one batched transaction"""
+        with self._counters_lock:
+            pending = self._pending_counters
+            self._pending_counters = defaultdict(lambda: [0, 0])
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        if not pending:
+            return
+        
+        deltas = [(prompt_id, uses, fails) for prompt_id, (uses, fails) in pending.items()]
+        try:
+            prompt_repository.apply_counter_deltas(deltas)
+        except Exception as e:
+            logger.error("Error writing batched prompt counters - prompts: %s, error: %s", len(deltas), e, exc_info=True)
+    
+    def _remember_hash(self, prompt_hash: str) -> None:
+        """Record a prompt hash as existing, evicting the least recently used when full"""
+        with self._known_hashes_lock:
+            self._known_hashes[prompt_hash] = None
+            self._known_hashes.move_to_end(prompt_hash)
+            if len(self._known_hashes) > KNOWN_PROMPT_CACHE_SIZE:
+                self._known_hashes.popitem(last=False)
+    
+    def _forget_hashes(self) -> None:
+        """Drop all known prompt hashes after rows were removed or rehashed"""
+        with self._known_hashes_lock:
+            self._known_hashes.clear()
+    
+    def _attach_thumbnail(self, prompt: Prompt, image_data: bytes) -> None:
+        """Generate a thumbnail from image data and store it on the prompt"""
+        thumbnail_result = self._generate_thumbnail(image_data)
+        if thumbnail_result["success"]:
+            prompt.thumbnail_data = thumbnail_result["thumbnail_data"]
+            prompt.thumbnail_mime = thumbnail_result["mime_type"]
+            prompt.thumbnail_width = thumbnail_result["width"]
+            prompt.thumbnail_height = thumbnail_result["height"]
+        else:
+            logger.warning("Failed to generate thumbnail: %s", thumbnail_result['error'])
+    
     def _generate_thumbnail(
         self,
         image_data: bytes
@@ -295,25 +355,9 @@ class PromptService:
         result = ThumbnailGenerator.generate_thumbnail_from_bytes(image_data)
         
         if not result["success"]:
-            logger.error(f"Thumbnail generation failed - error: {result['error']}")
+            logger.error("Thumbnail generation failed - error: %s", result['error'])
         
         return result
-    
-    def _prompt_to_response(self, prompt: Prompt) -> PromptResponse:
-        """Convert Prompt model to PromptResponse"""
-        return PromptResponse(
-            id=prompt.id,
-            prompt_text=prompt.prompt_text,
-            prompt_hash=prompt.prompt_hash,
-            total_uses=prompt.total_uses,
-            total_fails=prompt.total_fails,
-            first_used_at=prompt.first_used_at,
-            last_used_at=prompt.last_used_at,
-            model=prompt.model,
-            thumbnail_mime=prompt.thumbnail_mime,
-            thumbnail_width=prompt.thumbnail_width,
-            thumbnail_height=prompt.thumbnail_height
-        )
 
 # Global service instance
 prompt_service = PromptService()
@@ -5,16 +5,23 @@ Service layer that handles business logic for image generation from prompts.
 Uses the AI generator classes for the actual AI operations.
 """
 
+import asyncio
 import logging
-import tempfile
-import os
 from typing import Tuple, Optional, List
+
+import xxhash
 from fastapi import HTTPException, UploadFile
 
 from ..ai.factory import ImageGeneratorFactory
 from ..ai.prompt_generator import prompt_generator
 from .prompt_service import prompt_service
+from .reference_image_service import reference_image_service
 from ..db.config import settings
+from ..constants import (
+    GENERATION_CACHE_MAX_BYTES, GENERATION_CACHE_TTL_SECONDS,
+    RECENT_GENERATIONS_MAX_BYTES, RECENT_GENERATIONS_TTL_SECONDS
+)
+from ..utils.cache import BytesLRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +31,15 @@ class PromptToImageService:
     
     def __init__(self):
         self.prompt_service = prompt_service
+        # Recent generations keyed by provider + prompt + reference image content
+        self._generation_cache = BytesLRUCache(
+            GENERATION_CACHE_MAX_BYTES, ttl_seconds=GENERATION_CACHE_TTL_SECONDS
+        )
+        # Images returned by /generate, by response id, so the caller that received
+        # one can save its prompt with that image as the thumbnail
+        self._recent_generations = BytesLRUCache(
+            RECENT_GENERATIONS_MAX_BYTES, ttl_seconds=RECENT_GENERATIONS_TTL_SECONDS
+        )
     
     def _get_generator(self, provider: Optional[str] = None):
         """
@@ -36,14 +52,53 @@ class PromptToImageService:
             BaseImageGenerator: Generator instance
         """
         provider = provider or getattr(settings, 'default_ai_provider', 'gemini')
-        return ImageGeneratorFactory.create(provider)
+        return ImageGeneratorFactory.get_or_create(provider)
+    
+    @staticmethod
+    def _generation_cache_key(provider: str, prompt: str, image_content: bytes) -> bytes:
+        """Build the exact-match cache key for a prompt + reference image generation"""
+        hasher = xxhash.xxh3_128()
+        hasher.update(provider.encode('utf-8'))
+        hasher.update(b'\0')
+        hasher.update(prompt.encode('utf-8'))
+        hasher.update(b'\0')
+        hasher.update(image_content)
+        return hasher.digest()
+    
+    def remember_generation(self, generation_id: str, image_data: bytes, content_type: str) -> None:
+        """
+        Keep a generated image under the response id it was returned with
+        
+        Args:
+            generation_id: Unguessable response id, known only to the caller it was sent to
+            image_data: Generated image bytes
+            content_type: MIME type of the generated image
+        """
+        self._recent_generations.put(generation_id, image_data, content_type)
+    
+    def get_recent_image(self, generation_id: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Get an image recently returned under a response id, if still cached
+        
+        Args:
+            generation_id: Response id of the generation
+            
+        Returns:
+            Optional[Tuple[bytes, str]]: (image_data, content_type), or None
+        """
+        return self._recent_generations.get(generation_id)
+    
+    @staticmethod
+    async def _read_upload(upload: UploadFile) -> Tuple[bytes, Optional[str]]:
+        """Read an uploaded file once, returning (image_content, content_type)"""
+        return await upload.read(), upload.content_type
     
     async def generate_image_from_prompt(
         self, 
         prompt: str, 
         reference_image: UploadFile,
         provider: Optional[str] = None
-    ) -> Tuple[bytes, str, str]:
+    ) -> Tuple[bytes, str, str, bool]:
         """
         Generate an image from a text prompt and reference image
         
@@ -53,18 +108,36 @@ class PromptToImageService:
             provider: AI provider to use (defaults to gemini)
             
         Returns:
-            Tuple[bytes, str, str]: (image_data, content_type, reference_image_url)
+            Tuple[bytes, str, str, bool]: (image_data, content_type, reference_image_url,
+                from_cache), where from_cache is True when no model call was made
             
         Raises:
             HTTPException: If generation fails
         """
         try:
+            provider = provider or getattr(settings, 'default_ai_provider', 'gemini')
             generator = self._get_generator(provider)
-            reference_image_url = generator.process_reference_image(reference_image)
+            # Read the upload once (async) and hand the same bytes to every consumer
+            image_content, image_content_type = await self._read_upload(reference_image)
+            reference_image_url = reference_image_service.store(image_content, reference_image.filename)
+            
+            # When enabled, identical prompt + image requests reuse the recent
+            # result instead of another model call
+            cache_key = None
+            if settings.cache_generations:
+                cache_key = self._generation_cache_key(provider, prompt, image_content)
+                cached = self._generation_cache.get(cache_key)
+                if cached is not None:
+                    logger.info("Serving generated image from cache")
+                    generated_image_data, content_type = cached
+                    return generated_image_data, content_type, reference_image_url, True
+            
             generated_image_data, content_type = await generator.generate_from_image_and_text(
-                reference_image, prompt
+                image_content, prompt, image_content_type
             )
-            return generated_image_data, content_type, reference_image_url
+            if cache_key is not None:
+                self._generation_cache.put(cache_key, generated_image_data, content_type)
+            return generated_image_data, content_type, reference_image_url, False
             
         except HTTPException:
             # Re-raise HTTPExceptions as-is (they already have proper status codes and messages)
@@ -99,16 +172,15 @@ class PromptToImageService:
         """
         try:
             generator = self._get_generator(provider)
-            # Process first image as reference image URL (for response)
-            reference_image_url = generator.process_reference_image(image1)
-            
-            # Reset file pointers
-            image1.file.seek(0)
-            image2.file.seek(0)
+            image1_upload, image2_upload = await asyncio.gather(
+                self._read_upload(image1), self._read_upload(image2)
+            )
+            # Store first image so the response can link to it
+            reference_image_url = reference_image_service.store(image1_upload[0], image1.filename)
             
             # Generate fusion using multiple images
             generated_image_data, content_type = await generator.generate_from_multiple_images_and_text(
-                [image1, image2], 
+                [image1_upload, image2_upload], 
                 prompt_generator.fusion_prompt()
             )
             return generated_image_data, content_type, reference_image_url
@@ -146,17 +218,16 @@ class PromptToImageService:
         """
         try:
             generator = self._get_generator(provider)
-            # Process background image as reference image URL (for response)
-            reference_image_url = generator.process_reference_image(background_image)
-            
-            # Reset file pointers
-            background_image.file.seek(0)
-            person_image.file.seek(0)
+            background_upload, person_upload = await asyncio.gather(
+                self._read_upload(background_image), self._read_upload(person_image)
+            )
+            # Store background image so the response can link to it
+            reference_image_url = reference_image_service.store(background_upload[0], background_image.filename)
             
             # Generate using multiple images
             # Note: The order matters - person image is first (primary), background is second
             generated_image_data, content_type = await generator.generate_from_multiple_images_and_text(
-                [person_image, background_image], 
+                [person_upload, background_upload], 
                 prompt_generator.teleport_prompt()
             )
             return generated_image_data, content_type, reference_image_url
@@ -0,0 +1,75 @@
+"""
+Reference Image Service
+
+Keeps uploaded reference images in memory for a short time so generation
+responses can link to them by URL instead of embedding them as data URLs.
+"""
+
+import logging
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+import xxhash
+
+from ..constants import REFERENCE_IMAGE_CACHE_MAX_BYTES, REFERENCE_IMAGE_TTL_SECONDS
+from ..db.config import settings
+from ..utils.cache import BytesLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Content type by file extension, used when the upload does not declare one
+_CONTENT_TYPE_BY_EXTENSION = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp'
+}
+
+
+class ReferenceImageService:
+    """Short-lived in-memory store for uploaded reference images"""
+
+    def __init__(self):
+        self._images = BytesLRUCache(
+            REFERENCE_IMAGE_CACHE_MAX_BYTES, ttl_seconds=REFERENCE_IMAGE_TTL_SECONDS
+        )
+
+    def store(self, image_content: bytes, filename: Optional[str] = None) -> str:
+        """
+        Remember an uploaded reference image and return the URL it is served from
+
+        Args:
+            image_content: Raw bytes of the uploaded image
+            filename: Original upload filename, used to infer the content type
+
+        Returns:
+            str: Relative URL of the reference image, or a content-hash identifier
+                when serving reference images is disabled
+        """
+        if not settings.serve_reference_images:
+            return f"xxh3:{xxhash.xxh3_64_hexdigest(image_content)}"
+
+        file_extension = Path(filename or "reference").suffix.lower()
+        content_type = _CONTENT_TYPE_BY_EXTENSION.get(file_extension, 'image/jpeg')
+
+        reference_id = uuid.uuid4().hex
+        self._images.put(reference_id, image_content, content_type)
+        return f"/api/reference/{reference_id}"
+
+    def get(self, reference_id: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Get a stored reference image
+
+        Args:
+            reference_id: ID from the reference image URL
+
+        Returns:
+            Optional[Tuple[bytes, str]]: (image_data, content_type), or None if expired or unknown
+        """
+        return self._images.get(reference_id)
+
+
+# Global service instance
+reference_image_service = ReferenceImageService()
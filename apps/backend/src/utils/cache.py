@@ -0,0 +1,60 @@
+"""
+In-process caching utilities
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class BytesLRUCache:
+    """Thread-safe LRU cache of (bytes, metadata) values bounded by total byte size and optional TTL"""
+    
+    def __init__(self, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, Any, Optional[float]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, Any]]:
+        """Return the cached (data, metadata) for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            data, metadata, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._size -= len(data)
+                return None
+            self._entries.move_to_end(key)
+            return data, metadata
+    
+    def put(self, key: Hashable, data: bytes, metadata: Any = None) -> None:
+        """Store data for key, evicting least recently used entries past max_bytes"""
+        if len(data) > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (data, metadata, expires_at)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+    
+    def pop(self, key: Hashable) -> None:
+        """Drop key from the cache if present"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+    
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
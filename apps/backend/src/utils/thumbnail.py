@@ -3,11 +3,37 @@ Thumbnail generation utilities
 """
 import io
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+import xxhash
 from PIL import Image
 
+from ..constants import THUMBNAIL_ENCODE_CACHE_MAX_BYTES, THUMBNAIL_WEBP_METHOD
+from .cache import BytesLRUCache
+
 logger = logging.getLogger(__name__)
 
+# Encoder options and MIME type per output format. quality and method are passed
+# to every save; encoders ignore the options they don't use (PNG both, JPEG method).
+# JPEG is single-pass baseline 4:2:0: Huffman optimization costs a second pass for
+# a few percent on a thumbnail, so it is opt-in through the optimize parameter
+_SAVE_OPTIONS = {
+    "WEBP": ({"format": "WEBP", "lossless": False, "exact": False}, "image/webp"),
+    "JPEG": ({"format": "JPEG", "optimize": False, "progressive": False, "subsampling": 2}, "image/jpeg"),
+    "PNG": ({"format": "PNG", "optimize": True}, "image/png")
+}
+
+# Lossy outputs hide the difference between bilinear and Lanczos at thumbnail
+# sizes, so only lossless PNG pays for the wider Lanczos filter by default
+_DEFAULT_RESAMPLE = {
+    "WEBP": Image.Resampling.BILINEAR,
+    "JPEG": Image.Resampling.BILINEAR,
+    "PNG": Image.Resampling.LANCZOS
+}
+
+# Recent results of generate_thumbnail_from_bytes, keyed by source hash and encode options
+_encoded_thumbnails = BytesLRUCache(THUMBNAIL_ENCODE_CACHE_MAX_BYTES)
+
 class ThumbnailGenerator:
     """Utility for generating thumbnails"""
     
@@ -16,17 +42,22 @@ class ThumbnailGenerator:
         image_path: str,
         max_size: int = 256,
         quality: int = 60,
-        format: str = "WEBP"
+        format: str = "WEBP",
+        method: int = THUMBNAIL_WEBP_METHOD,
+        optimize: bool = False,
+        resample: Optional[Image.Resampling] = None
     ) -> Dict[str, Any]:
         """Generate thumbnail from image file"""
         try:
             with Image.open(image_path) as img:
-                result = ThumbnailGenerator._process_image(img, max_size, quality, format)
+                result = ThumbnailGenerator._process_image(
+                    img, max_size, quality, format, method, optimize, resample
+                )
                 if not result["success"]:
-                    logger.error(f"Thumbnail generation failed: {result['error']}")
+                    logger.error("Thumbnail generation failed: %s", result['error'])
                 return result
         except Exception as e:
-            logger.error(f"Failed to generate thumbnail: {e}", exc_info=True)
+            logger.error("Failed to generate thumbnail: %s", e, exc_info=True)
             return ThumbnailGenerator._error_result(str(e))
     
     @staticmethod
@@ -34,17 +65,52 @@ class ThumbnailGenerator:
         image_data: bytes,
         max_size: int = 256,
         quality: int = 60,
-        format: str = "WEBP"
+        format: str = "WEBP",
+        method: int = THUMBNAIL_WEBP_METHOD,
+        optimize: bool = False,
+        resample: Optional[Image.Resampling] = None
     ) -> Dict[str, Any]:
-        """Generate thumbnail from image bytes"""
+        """Generate thumbnail from image bytes (repeat inputs are served from an in-memory cache)"""
+        format_key = format.upper()
+        cache_key = (
+            xxhash.xxh3_128_digest(image_data), max_size, quality, format_key,
+            method, optimize, resample
+        )
+        cached = _encoded_thumbnails.get(cache_key)
+        if cached is not None:
+            return dict(cached[1])
+        
         try:
             with Image.open(io.BytesIO(image_data)) as img:
-                result = ThumbnailGenerator._process_image(img, max_size, quality, format)
+                # Opening only parses the header: input that already is an RGB image
+                # in the target format and size is passed through without a re-encode
+                if (
+                    img.format == format_key
+                    and img.mode == 'RGB'
+                    and max(img.size) <= max_size
+                    and format_key in _SAVE_OPTIONS
+                ):
+                    width, height = img.size
+                    result = {
+                        "success": True,
+                        "thumbnail_data": image_data,
+                        "mime_type": _SAVE_OPTIONS[format_key][1],
+                        "width": width,
+                        "height": height,
+                        "size_bytes": len(image_data),
+                        "error": None
+                    }
+                else:
+                    result = ThumbnailGenerator._process_image(
+                        img, max_size, quality, format, method, optimize, resample
+                    )
                 if not result["success"]:
-                    logger.error(f"Thumbnail generation failed: {result['error']}")
-                return result
+                    logger.error("Thumbnail generation failed: %s", result['error'])
+                    return result
+            _encoded_thumbnails.put(cache_key, result["thumbnail_data"], dict(result))
+            return result
         except Exception as e:
-            logger.error(f"Failed to generate thumbnail: {e}", exc_info=True)
+            logger.error("Failed to generate thumbnail: %s", e, exc_info=True)
             return ThumbnailGenerator._error_result(str(e))
     
     @staticmethod
@@ -52,37 +118,52 @@ class ThumbnailGenerator:
         img: Image.Image,
         max_size: int,
         quality: int,
-        format: str
+        format: str,
+        method: int = THUMBNAIL_WEBP_METHOD,
+        optimize: bool = False,
+        resample: Optional[Image.Resampling] = None
     ) -> Dict[str, Any]:
         """Process image to create thumbnail"""
-        # Convert to RGB if necessary
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
+        save_options, mime_type = ThumbnailGenerator._save_options(format, optimize)
+        if resample is None:
+            resample = _DEFAULT_RESAMPLE[format.upper()]
+        
+        # Let libjpeg decode straight to the nearest 1/2, 1/4 or 1/8 scale that
+        # still covers max_size, instead of decoding every pixel and discarding most
+        if img.format == "JPEG":
+            img.draft("RGB", (max_size, max_size))
+        
+        # Palette images can't be smoothly resampled, so expand them first; modes
+        # the reducing resize can't handle (1, I, I;16, F, ...) go to RGB up front
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        elif img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'CMYK'):
             img = img.convert('RGB')
         
-        # Generate thumbnail
-        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        # Box-average very large inputs down by an integer factor first, so the
+        # resampling pass below runs on a buffer at most ~2x the target size
+        factor = min(img.size) // (max_size * 2)
+        if factor >= 2:
+            img = img.reduce(factor)
+        
+        # Generate thumbnail (inputs that already fit are not resampled). Pillow
+        # resamples RGBA/LA with premultiplied alpha, so edges don't bleed
+        if max(img.size) > max_size:
+            img.thumbnail((max_size, max_size), resample)
         width, height = img.size
         
+        # Flatten transparency and convert CMYK on the small image; grayscale
+        # is kept since every output format stores it directly
+        if img.mode in ('RGBA', 'LA'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        
         # Save to bytes
         output = io.BytesIO()
-        
-        if format.upper() == "WEBP":
-            img.save(output, format="WEBP", quality=quality, method=6)
-            mime_type = "image/webp"
-        elif format.upper() == "JPEG":
-            img.save(output, format="JPEG", quality=quality, optimize=True)
-            mime_type = "image/jpeg"
-        elif format.upper() == "PNG":
-            img.save(output, format="PNG", optimize=True)
-            mime_type = "image/png"
-        else:
-            raise ValueError(f"Unsupported format: {format}")
+        img.save(output, quality=quality, method=method, **save_options)
         
         thumbnail_data = output.getvalue()
         size_bytes = len(thumbnail_data)
@@ -101,29 +182,50 @@ class ThumbnailGenerator:
     def generate_thumbnail_from_pil_image(
         image: Image.Image,
         size: tuple = (150, 150),
-        quality: int = 85,
-        format: str = "JPEG"
+        quality: int = 80,
+        format: str = "WEBP",
+        method: int = THUMBNAIL_WEBP_METHOD,
+        optimize: bool = False,
+        resample: Optional[Image.Resampling] = None
     ) -> bytes:
-        """Generate thumbnail from PIL Image object"""
+        """Generate thumbnail from PIL Image object (WebP by default, matching the data URLs it feeds)"""
         try:
-            # Create a copy to avoid modifying the original
-            img_copy = image.copy()
-            
-            # Resize image while maintaining aspect ratio
-            img_copy.thumbnail(size, Image.Resampling.LANCZOS)
+            # Resize into a new image while maintaining aspect ratio (never enlarging);
+            # neither resize nor save touches the caller's image, so no copy is needed
+            width, height = image.size
+            ratio = min(size[0] / width, size[1] / height)
+            if ratio < 1:
+                target = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+                if resample is None:
+                    resample = _DEFAULT_RESAMPLE.get(format.upper(), Image.Resampling.LANCZOS)
+                img_copy = image.resize(target, resample)
+            else:
+                img_copy = image
             
             # Convert to RGB if necessary
             if img_copy.mode != 'RGB':
                 img_copy = img_copy.convert('RGB')
             
             # Save to bytes
+            save_options, _ = ThumbnailGenerator._save_options(format, optimize)
             img_byte_arr = io.BytesIO()
-            img_copy.save(img_byte_arr, format=format, quality=quality)
+            img_copy.save(img_byte_arr, quality=quality, method=method, **save_options)
             return img_byte_arr.getvalue()
             
         except Exception as e:
             raise Exception(f"Error generating thumbnail: {str(e)}")
     
+    @staticmethod
+    def _save_options(format: str, optimize: bool = False) -> Tuple[Dict[str, Any], str]:
+        """Look up encoder options and MIME type for an output format"""
+        try:
+            save_options, mime_type = _SAVE_OPTIONS[format.upper()]
+        except KeyError:
+            raise ValueError(f"Unsupported format: {format}") from None
+        if optimize and format.upper() == "JPEG":
+            save_options = {**save_options, "optimize": True}
+        return save_options, mime_type
+    
     @staticmethod
     def _error_result(error: str) -> Dict[str, Any]:
         """Return error result"""
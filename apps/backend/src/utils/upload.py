@@ -0,0 +1,104 @@
+"""
+Upload reading utilities
+"""
+import logging
+import os
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+# Read uploads in 64KB chunks so oversized files are rejected early
+UPLOAD_CHUNK_SIZE = 1 << 16
+
+# Number of leading bytes needed to identify a supported image format
+IMAGE_SNIFF_LENGTH = 32
+
+
+async def read_upload_limited(
+    file: UploadFile,
+    max_size: int,
+    detail: str = "Image too large",
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> bytes:
+    """
+    Read an uploaded file in chunks, aborting as soon as it exceeds max_size
+    
+    Args:
+        file: Uploaded file to read
+        max_size: Maximum allowed size in bytes
+        detail: Error detail returned when the file is too large
+        chunk_size: Number of bytes to read per chunk
+        
+    Returns:
+        bytes: The complete file contents
+        
+    Raises:
+        HTTPException: 413 if the file exceeds max_size
+    """
+    # The multipart parser records the spooled size, so a known size can be
+    # checked up front and read in one call without an intermediate buffer
+    size = getattr(file, 'size', None)
+    if size is not None:
+        if size > max_size:
+            logger.warning("Upload rejected - filename: %s, %s bytes exceeds %s", file.filename, size, max_size)
+            raise HTTPException(status_code=413, detail=detail)
+        await file.seek(0)
+        return await file.read()
+    
+    chunks = []
+    total = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        total += len(chunk)
+        if total > max_size:
+            logger.warning("Upload rejected - filename: %s, exceeded %s bytes", file.filename, max_size)
+            raise HTTPException(status_code=413, detail=detail)
+    return b"".join(chunks)
+
+
+def get_upload_size(file: UploadFile) -> int:
+    """
+    Get the size of an uploaded file without reading its contents
+    
+    Uploads are spooled to a temporary file (on disk past the spool threshold),
+    so when the parser did not record a size it is measured by seeking to the end.
+    
+    Args:
+        file: Uploaded file to measure
+        
+    Returns:
+        int: Size of the upload in bytes
+    """
+    size = getattr(file, 'size', None)
+    if size is not None:
+        return size
+    position = file.file.tell()
+    size = file.file.seek(0, os.SEEK_END)
+    file.file.seek(position)
+    return size
+
+
+def sniff_image_mime(head: bytes) -> Optional[str]:
+    """
+    Identify an image format from its leading magic bytes without decoding it
+    
+    Args:
+        head: The first bytes of the file (IMAGE_SNIFF_LENGTH is enough)
+        
+    Returns:
+        Optional[str]: The detected MIME type, or None if not a supported image
+    """
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'image/gif'
+    return None
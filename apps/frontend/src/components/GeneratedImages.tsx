@@ -121,7 +121,7 @@ export default function GeneratedImages({ images, onDelete, onClearAll }: Genera
     setSavingIds(prev => new Set(prev).add(image.id))
 
     try {
-      await savePrompt(image.prompt)
+      await savePrompt(image.prompt, String(image.id))
       
       setSavedIds(prev => new Set(prev).add(image.id))
       addToast({
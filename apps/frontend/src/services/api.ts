@@ -287,9 +287,13 @@ export const updatePrompt = async (promptId: number, promptText: string): Promis
   return response.data
 }
 
-export const savePrompt = async (prompt: string): Promise<Prompt> => {
+export const savePrompt = async (prompt: string, generationId?: string): Promise<Prompt> => {
   const formData = new FormData()
   formData.append('prompt', prompt)
+  if (generationId) {
+    // Lets the backend reuse the image this client just generated as the thumbnail
+    formData.append('generation_id', generationId)
+  }
 
   const apiResponse = await api.post('/prompts/save', formData, {
     headers: {